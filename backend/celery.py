@@ -1,9 +1,20 @@
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 app = Celery("backend")
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_embedding_model(**kwargs):
+    from django.conf import settings
+
+    if settings.EMBEDDING_WARMUP:
+        from base.ai.embedding import warmup
+
+        warmup()
@@ -314,6 +314,28 @@ ADMIN_ALERT_EMAIL = env("ADMIN_ALERT_EMAIL", default=EMAIL_HOST_USER)
 LOW_STOCK_THRESHOLD = env.int("LOW_STOCK_THRESHOLD", default=5)
 LOW_STOCK_ALERT_COOLDOWN = env.int("LOW_STOCK_ALERT_COOLDOWN", default=6 * 60 * 60)  # seconds
 
+# --- Semantic search ---
+# Candidate list size for HNSW semantic search (pgvector default 40): higher
+# raises recall at the cost of latency. Must be >= the LIMIT searched for.
+HNSW_EF_SEARCH = env.int("HNSW_EF_SEARCH", default=40)
+# "pgvector" (SQL over the HNSW index) or "numpy" (base.ai.vector_index, an
+# in-process matrix per worker). SQLite has no vector operators: numpy.
+SEMANTIC_SEARCH_ENGINE = env(
+    "SEMANTIC_SEARCH_ENGINE",
+    default="numpy" if DATABASES["default"]["ENGINE"].endswith("sqlite3") else "pgvector",
+)
+# Load the embedding model when a web or Celery worker process starts
+# instead of on its first search / re-embed (base.ai.embedding.warmup).
+EMBEDDING_WARMUP = env.bool("EMBEDDING_WARMUP", default=False)
+# Micro-batch concurrent embed_text() calls (threaded workers, e.g.
+# gunicorn --threads): up to MAX_SIZE queries arriving within MAX_WAIT_MS
+# share one encode. 1 disables it, which suits single-threaded workers.
+EMBED_BATCH_MAX_SIZE = env.int("EMBED_BATCH_MAX_SIZE", default=1)
+EMBED_BATCH_MAX_WAIT_MS = env.float("EMBED_BATCH_MAX_WAIT_MS", default=2.0)
+# "torch" (fp32) or "torch-int8" (dynamically quantized Linear layers,
+# faster on CPU-only nodes). Compare: manage.py bench_embedding_quantization
+EMBEDDING_BACKEND = env("EMBEDDING_BACKEND", default="torch")
+
 # --- Redis (cache + optional Celery broker) ---
 REDIS_URL = env("REDIS_URL", default="").strip()
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default=REDIS_URL).strip()
@@ -362,6 +384,14 @@ CELERY_BROKER_TRANSPORT_OPTIONS = {
     "socket_timeout": CELERY_BROKER_CONNECTION_TIMEOUT,
     "socket_connect_timeout": CELERY_BROKER_CONNECTION_TIMEOUT,
 }
+# best_seller / featured / top listings read ProductRanking, rebuilt this often.
+PRODUCT_RANKINGS_REFRESH_SECONDS = env.int("PRODUCT_RANKINGS_REFRESH_SECONDS", default=15 * 60)
+CELERY_BEAT_SCHEDULE = {
+    "refresh-product-rankings": {
+        "task": "base.tasks.refresh_product_rankings_task",
+        "schedule": PRODUCT_RANKINGS_REFRESH_SECONDS,
+    },
+}
 
 FRONTEND_URL = env("FRONTEND_URL", default="https://electrovix.vercel.app").rstrip("/")
 
@@ -0,0 +1,101 @@
+# base/ai/batching.py
+
+"""
+Micro-batching for concurrent encode calls. In a threaded worker, every
+search used to encode its query as a batch of one; the dispatcher below
+gathers the texts that arrive within a few milliseconds of each other
+into one encode() call and hands each caller its own vector.
+"""
+import os
+import queue
+import threading
+import time
+
+
+class _Pending:
+    __slots__ = ("text", "done", "vector", "error")
+
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.vector = None
+        self.error = None
+
+
+class EmbeddingBatcher:
+    """
+    `encode(texts)` -> one vector per text, called from a single daemon
+    thread with at most `max_batch_size` texts. A batch closes when it is
+    full or `max_wait` seconds after its first text arrived. A caller whose
+    batch has not come back within `timeout` seconds encodes its text
+    itself, so a stuck dispatcher slows searches down but never hangs them.
+    """
+
+    def __init__(self, encode, max_batch_size=32, max_wait=0.002, timeout=5.0):
+        self.encode = encode
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.timeout = timeout
+        self.batches = 0  # encode() calls so far (benchmarks)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+
+    def submit(self, text):
+        """Block until `text` has been encoded as part of some batch."""
+        pending = _Pending(text)
+        self._queue().put(pending)
+        if not pending.done.wait(self.timeout):
+            return self.encode([text])[0]
+        if pending.error is not None:
+            raise pending.error
+        return pending.vector
+
+    def _queue(self):
+        # The thread does not survive a fork (gunicorn, Celery prefork), so
+        # start one per process on first use, and again if it ever died.
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pending = queue.SimpleQueue()
+                    self._thread = None
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._pending,), name="embedding-batcher", daemon=True
+                    )
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._pending
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(pending.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._encode(batch)
+
+    def _encode(self, batch):
+        try:
+            # Identical queries (a trending search) are encoded once.
+            texts = list(dict.fromkeys(item.text for item in batch))
+            vectors = list(self.encode(texts))
+            if len(vectors) != len(texts):
+                raise ValueError(f"encode() returned {len(vectors)} vectors for {len(texts)} texts")
+            vectors = dict(zip(texts, vectors))
+            for item in batch:
+                item.vector = vectors[item.text]
+        except Exception as exc:
+            for item in batch:
+                item.error = exc
+        finally:
+            # Whatever happened (even a BaseException ending this thread,
+            # which the next submit() restarts), release every caller.
+            for item in batch:
+                if item.vector is None and item.error is None:
+                    item.error = RuntimeError("Embedding batch was interrupted")
+                item.done.set()
+            self.batches += 1
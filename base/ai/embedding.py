@@ -1,9 +1,83 @@
 # base/ai/embedding.py
 
-from sentence_transformers import SentenceTransformer
+import threading
+
+from django.conf import settings
+
+from base.ai.batching import EmbeddingBatcher
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Loaded on first use, once per process: importing torch and reading the
+# weights costs seconds and a few hundred MB, which processes that never
+# encode (most management commands, beat, web workers without search
+# traffic) should not pay at boot.
+_model = None
+_model_lock = threading.Lock()
+_batcher = None
+
+
+BACKENDS = ("torch", "torch-int8")
+
+
+def model_id() -> str:
+    """Identifies the vectors this process produces (query cache keys)."""
+    backend = settings.EMBEDDING_BACKEND
+    return MODEL_NAME if backend == "torch" else f"{MODEL_NAME}:{backend}"
+
+
+def load_model(backend="torch"):
+    """
+    A new SentenceTransformer for `backend`: "torch" (fp32) or "torch-int8",
+    with every Linear layer dynamically quantized to int8 weights (about
+    twice as fast on CPU; see bench_embedding_quantization for parity).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME)
+    if backend == "torch-int8":
+        import torch
+
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_model():
+    """The shared model for settings.EMBEDDING_BACKEND, loaded on first call (thread-safe)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(settings.EMBEDDING_BACKEND)
+    return _model
+
+
+def warmup():
+    """Load the model and run one encode so the first real query is not slow."""
+    embed_text("warmup")
 
-# loads only once
-EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")
 
 def embed_text(text: str):
-    return EMBED_MODEL.encode([text], normalize_embeddings=True)[0].tolist()
+    if settings.EMBED_BATCH_MAX_SIZE > 1:
+        return _dispatcher().submit(text)
+    return get_model().encode([text], normalize_embeddings=True)[0].tolist()
+
+
+def embed_texts(texts):
+    """Batch variant of embed_text: one encode call for many texts."""
+    return [vector.tolist() for vector in get_model().encode(list(texts), normalize_embeddings=True)]
+
+
+def _dispatcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    embed_texts,
+                    max_batch_size=settings.EMBED_BATCH_MAX_SIZE,
+                    max_wait=settings.EMBED_BATCH_MAX_WAIT_MS / 1000,
+                )
+    return _batcher
@@ -0,0 +1,51 @@
+# base/ai/query_cache.py
+
+"""
+Query embeddings shared by every worker: popular searches are encoded
+once, stored in the cache as packed float16 bytes (768 B instead of a
+pickled list of 384 floats), with a small per-process LRU in front.
+"""
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+from django.core.cache import cache
+
+from base.ai import embedding
+
+QUERY_CACHE_TTL = 7 * 24 * 60 * 60
+LOCAL_QUERY_CACHE_SIZE = 512
+# Unit vectors: float16 keeps cosine distances within ~1e-3.
+STORED_DTYPE = np.float16
+
+
+def normalize(text: str) -> str:
+    # The model is uncased and ignores runs of whitespace.
+    return " ".join((text or "").lower().split())
+
+
+def _key(normalized: str) -> str:
+    digest = hashlib.sha256(f"{embedding.model_id()}\0{normalized}".encode()).hexdigest()
+    return f"query_embedding:{digest[:32]}"
+
+
+def embed_query(text: str) -> list:
+    """embed_text() for a search query, cached per process and across workers."""
+    return list(_embed_normalized(normalize(text)))
+
+
+@lru_cache(maxsize=LOCAL_QUERY_CACHE_SIZE)
+def _embed_normalized(normalized: str) -> tuple:
+    key = _key(normalized)
+    packed = cache.get(key)
+    if packed is None:
+        vector = np.asarray(embedding.embed_text(normalized), dtype=STORED_DTYPE)
+        cache.set(key, vector.tobytes(), QUERY_CACHE_TTL)
+    else:
+        vector = np.frombuffer(packed, dtype=STORED_DTYPE)
+    # Both paths return the float16-rounded vector, so a hit equals a miss.
+    return tuple(vector.astype(np.float32).tolist())
+
+
+def clear_local_query_cache():
+    _embed_normalized.cache_clear()
@@ -0,0 +1,215 @@
+# base/ai/vector_index.py
+
+"""
+In-process semantic index: every product embedding in one contiguous
+float32 matrix, answering top-k cosine queries with a single
+matrix-vector product and argpartition (no database round trip).
+
+Used when settings.SEMANTIC_SEARCH_ENGINE == "numpy" (the default on
+SQLite, where pgvector has no operators). Each worker keeps its own copy
+(about 1.5 KB per product) and refreshes it incrementally: writers call
+mark_vector_index_stale(), and on the next search every worker diffs
+(_id, embeddingHash) pairs and reloads only the rows that changed.
+"""
+import threading
+import time
+
+import numpy as np
+from django.core.cache import cache
+
+VERSION_KEY = "vector_index:version"
+# How often a worker may look at VERSION_KEY (one cache read).
+CHECK_INTERVAL = 5.0
+# Rows fetched per query when (re)loading changed embeddings.
+LOAD_CHUNK = 1000
+DIMENSIONS = 384
+
+
+def mark_vector_index_stale(full=False):
+    """
+    Tell every worker's index to resync. `full` drops and reloads all
+    rows, for re-encodes that keep embeddingHash (a new model).
+    """
+    generation, _ = cache.get(VERSION_KEY) or (0, 0)
+    cache.set(VERSION_KEY, (generation + int(full), time.time_ns()), None)
+
+
+class _Rows:
+    """
+    One generation of the index. Searches read a published _Rows without
+    locking, so it is never modified after publication: a resync edits a
+    copy() and swaps it in whole.
+    """
+
+    def __init__(self, dimensions):
+        self.ids = np.empty(0, dtype=np.int64)  # -1 marks a free row
+        self.matrix = np.empty((0, dimensions), dtype=np.float32)  # unit rows; free rows are zero
+        self.size = 0  # rows in use, free ones included
+        self.rows = {}  # pk -> row
+        self.hashes = {}  # pk -> embeddingHash the row was loaded at
+        self.free = []
+
+    def copy(self):
+        rows = _Rows(self.matrix.shape[1])
+        rows.ids, rows.matrix, rows.size = self.ids.copy(), self.matrix.copy(), self.size
+        rows.rows, rows.hashes, rows.free = dict(self.rows), dict(self.hashes), list(self.free)
+        return rows
+
+    def put(self, pk, digest, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        row = self.rows.get(pk)
+        if row is None:
+            row = self.free.pop() if self.free else self._grow()
+            self.rows[pk] = row
+        self.matrix[row] = vector / norm if norm else 0.0
+        self.ids[row] = pk
+        self.hashes[pk] = digest
+
+    def remove(self, pk):
+        row = self.rows.pop(pk)
+        del self.hashes[pk]
+        self.ids[row] = -1
+        self.matrix[row] = 0.0
+        self.free.append(row)
+
+    def _grow(self):
+        if self.size == len(self.ids):
+            capacity = max(1024, self.size * 2)
+            ids = np.full(capacity, -1, dtype=np.int64)
+            matrix = np.zeros((capacity, self.matrix.shape[1]), dtype=np.float32)
+            ids[:self.size] = self.ids[:self.size]
+            matrix[:self.size] = self.matrix[:self.size]
+            self.ids, self.matrix = ids, matrix
+        self.size += 1
+        return self.size - 1
+
+
+class VectorIndex:
+    def __init__(self, dimensions=DIMENSIONS):
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        self._data = _Rows(dimensions)
+        self._version = None
+        self._checked = None
+
+    def __len__(self):
+        return len(self._data.rows)
+
+    def search(self, query, k, max_distance=None, exclude=()):
+        """
+        [(pk, cosine distance)] for the `k` nearest products, closest first,
+        skipping `exclude` and anything farther than `max_distance`.
+        """
+        self.refresh()
+        data = self._data
+        size = data.size
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not data.rows or not norm or k <= 0:
+            return []
+
+        ids = data.ids[:size]
+        scores = data.matrix[:size] @ (query / norm)
+        scores[ids < 0] = -np.inf  # free rows never take a top-k slot
+        wanted = min(k + len(exclude), len(data.rows))
+        top = np.argpartition(-scores, wanted - 1)[:wanted] if wanted < size else np.arange(size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        hits = []
+        for row in top:
+            pk = int(ids[row])
+            if pk < 0 or pk in exclude:
+                continue
+            distance = 1.0 - float(scores[row])
+            if max_distance is not None and distance > max_distance:
+                break
+            hits.append((pk, distance))
+            if len(hits) == k:
+                break
+        return hits
+
+    def refresh(self, force=False):
+        """Resync if another process changed embeddings (checked every CHECK_INTERVAL)."""
+        if not force and self._fresh():
+            return
+        if self._version is not None and not force:
+            # Already loaded: while another thread resyncs, search the
+            # published rows instead of waiting for it.
+            if not self._lock.acquire(blocking=False):
+                return
+        else:
+            # Nothing to search yet (or forced): wait for the load.
+            self._lock.acquire()
+        try:
+            if not force and self._fresh():
+                return
+            checked = time.monotonic()
+            version = cache.get(VERSION_KEY)
+            if version is None:
+                # Never bumped, or evicted: start a version so idle workers
+                # stop diffing until the next real change.
+                cache.add(VERSION_KEY, (0, time.time_ns()), None)
+                version = cache.get(VERSION_KEY)
+            if force or version is None or version != self._version:
+                reset = version is not None and self._version is not None and version[0] != self._version[0]
+                self._sync(reset)
+                self._version = version
+            # Only now, so concurrent searches keep waiting for a first load.
+            self._checked = checked
+        finally:
+            self._lock.release()
+
+    def _fresh(self):
+        return self._checked is not None and time.monotonic() - self._checked < CHECK_INTERVAL
+
+    def _sync(self, reset=False):
+        current = self._current_hashes()
+        loaded = {} if reset else self._data.hashes
+        removed = loaded.keys() - current.keys()
+        changed = [pk for pk, digest in current.items() if pk not in loaded or loaded[pk] != digest]
+        if not reset and not removed and not changed:
+            return
+
+        data = _Rows(self.dimensions) if reset else self._data.copy()
+        for pk in removed:
+            data.remove(pk)
+        for start in range(0, len(changed), LOAD_CHUNK):
+            for pk, digest, vector in self._load(changed[start:start + LOAD_CHUNK]):
+                if vector is not None:
+                    data.put(pk, digest, vector)
+        self._data = data
+
+    def _current_hashes(self):
+        """{pk: embeddingHash} for every product with an embedding."""
+        from base.models import Product
+
+        return dict(
+            Product.objects.filter(embedding__isnull=False).values_list("_id", "embeddingHash").iterator()
+        )
+
+    def _load(self, pks):
+        """(pk, embeddingHash, embedding) rows for `pks`."""
+        from base.models import Product
+
+        return Product.objects.filter(_id__in=pks).values_list("_id", "embeddingHash", "embedding")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def vector_index() -> VectorIndex:
+    """This worker's index, created (empty) on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VectorIndex()
+    return _index
+
+
+def clear_vector_index():
+    """Forget this worker's index (tests)."""
+    global _index
+    _index = None
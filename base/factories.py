@@ -59,6 +59,7 @@ class ProductFactory(factory.django.DjangoModelFactory):
     countInStock = factory.Faker("random_int", min=0, max=100)
     rating = factory.LazyFunction(lambda: Decimal(str(round(__import__("random").uniform(3, 5), 1))))
     numReviews = factory.Faker("random_int", min=0, max=20)
+    ratingTotal = factory.LazyAttribute(lambda o: int(round(o.rating * o.numReviews)))
     discountPercentage = None
     image = None  # or default='/placeholder.png'
     user = factory.SubFactory(UserFactory)
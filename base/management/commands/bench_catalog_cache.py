@@ -0,0 +1,97 @@
+"""
+Compare catalog cache hits: pickled response.data vs pre-rendered bytes,
+served from the shared cache only or from the in-process L1.
+Run: python manage.py bench_catalog_cache --iterations 2000 --page-size 8
+"""
+import pickle
+import time
+import uuid
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from base.models import Product
+from base.serializers import ProductListSerializer
+from base.utils import catalog_cache
+from base.utils.catalog_cache import _make_key, cached_catalog, clear_local_cache
+
+
+def _stored_bytes(key):
+    """Redis MEMORY USAGE when django-redis is configured, else pickled size."""
+    try:
+        from django_redis import get_redis_connection
+
+        usage = get_redis_connection("default").memory_usage(cache.make_key(key))
+        if usage is not None:
+            return usage, "redis MEMORY USAGE"
+    except Exception:
+        pass
+    return len(pickle.dumps(cache.get(key), pickle.HIGHEST_PROTOCOL)), "pickled size"
+
+
+class Command(BaseCommand):
+    help = "Benchmark cached_catalog hit latency and cache memory: data vs rendered bytes, L1 vs shared"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--page-size", type=int, default=8)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        factory = APIRequestFactory()
+
+        products = Product.objects.select_related("category", "brand")[: options["page_size"]]
+        request = factory.get("/api/products/")
+        page = {
+            "products": ProductListSerializer(products, many=True, context={"request": request}).data,
+            "page": 1,
+            "pages": 1,
+            "total": len(products),
+        }
+        if not page["products"]:
+            self.stdout.write(self.style.WARNING("No products found; run seed_products first."))
+            return
+
+        self.stdout.write(
+            f"'products' page with {len(page['products'])} items, {iterations} hits per case"
+        )
+        for label, rendered in (("data (pickled dict)", False), ("rendered bytes", True)):
+            namespace = f"bench_{'rendered' if rendered else 'data'}"
+
+            @api_view(["GET"])
+            @cached_catalog(namespace, 300, rendered=rendered)
+            def view(request):
+                return Response(page)
+
+            path = f"/bench/{namespace}/{uuid.uuid4().hex}/"  # never reuse an old run's entry
+            view(factory.get(path))  # MISS: populate
+
+            payload = {"path": path, "query": {}, "args": [], "kwargs": {}}
+            if rendered:
+                payload["format"] = "application/json"
+            size, how = _stored_bytes(_make_key(namespace, payload))
+
+            for tier in ("shared", "L1"):
+                for encoding in ("gzip", ""):
+                    req = factory.get(path, HTTP_ACCEPT_ENCODING=encoding)
+                    start = time.perf_counter()
+                    for _ in range(iterations):
+                        if tier == "shared":
+                            clear_local_cache()
+                        response = view(req)
+                        if hasattr(response, "render"):
+                            response.render()
+                    elapsed = time.perf_counter() - start
+                    assert response["X-Cache"] == "HIT", response["X-Cache"]
+                    self.stdout.write(
+                        f"  {label:<20} {tier:<6} accept-encoding={encoding or '-':<5} "
+                        f"{elapsed / iterations * 1e6:8.1f} µs/hit  "
+                        f"body={len(response.content):6d} B  stored={size:6d} B ({how})"
+                    )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Done (gzip threshold {catalog_cache.GZIP_MIN_BYTES} B)")
+        )
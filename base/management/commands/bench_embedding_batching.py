@@ -0,0 +1,62 @@
+"""
+Compare query-embedding throughput with and without micro-batching at
+several levels of concurrency (threads calling embed_text at once).
+Run: python manage.py bench_embedding_batching --requests 512 --concurrency 1 8 32
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from base.ai.batching import EmbeddingBatcher
+from base.ai.embedding import embed_texts, get_model, warmup
+
+
+class Command(BaseCommand):
+    help = "Benchmark embed_text throughput: one encode per query vs micro-batched encodes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=512)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+        parser.add_argument("--max-batch-size", type=int, default=32)
+        parser.add_argument("--max-wait-ms", type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        # Distinct texts so batching gets no help from de-duplication.
+        texts = [f"wireless headphones with long battery life under {i} taka" for i in range(options["requests"])]
+        warmup()
+
+        def single(text):
+            return get_model().encode([text], normalize_embeddings=True)[0]
+
+        self.stdout.write(f"{len(texts)} queries per case")
+        for concurrency in options["concurrency"]:
+            batcher = EmbeddingBatcher(
+                embed_texts,
+                max_batch_size=options["max_batch_size"],
+                max_wait=options["max_wait_ms"] / 1000,
+            )
+            for label, embed, batched in (("batch of one", single, False), ("micro-batched", batcher.submit, True)):
+                latencies = []
+
+                def timed(text):
+                    start = time.perf_counter()
+                    embed(text)
+                    latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(timed, texts))
+                elapsed = time.perf_counter() - start
+
+                latencies.sort()
+                batches = batcher.batches if batched else len(texts)
+                self.stdout.write(
+                    f"  threads={concurrency:<3} {label:<14} {len(texts) / elapsed:8.1f} req/s  "
+                    f"p50={statistics.median(latencies) * 1e3:7.2f} ms  "
+                    f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1e3:7.2f} ms  "
+                    f"mean batch={len(texts) / batches:5.1f}"
+                )
+
+        self.stdout.write(self.style.SUCCESS("✅ Done"))
@@ -0,0 +1,77 @@
+"""
+Compare the fp32 and int8 embedding backends on the seeded catalog:
+single-query latency, batch throughput, and how closely int8 vectors
+(and the products they retrieve) agree with fp32.
+Run: python manage.py bench_embedding_quantization --limit 500 --queries 100
+"""
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from base.ai.embedding import BACKENDS, load_model
+from base.models import Product
+
+TOP_K = 10
+
+
+class Command(BaseCommand):
+    help = "Benchmark int8 vs fp32 embedding latency/throughput and report cosine parity"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500, help="Catalog products to encode")
+        parser.add_argument("--queries", type=int, default=100, help="Single-text encodes to time")
+        parser.add_argument("--batch-size", type=int, default=32)
+
+    def handle(self, *args, **options):
+        products = list(Product.objects.select_related("category", "brand").order_by("_id")[: options["limit"]])
+        if not products:
+            self.stdout.write(self.style.WARNING("No products found; run seed_products first."))
+            return
+        documents = [product.embedding_text() for product in products]
+        # Shopper-style queries: product names, encoded one at a time.
+        queries = [product.name for product in products][: options["queries"]]
+
+        self.stdout.write(f"{len(documents)} products, {len(queries)} single-query encodes per backend")
+        vectors = {}
+        for backend in BACKENDS:
+            model = load_model(backend)
+            model.encode(queries[:1], normalize_embeddings=True)
+
+            latencies = []
+            query_vectors = []
+            for query in queries:
+                start = time.perf_counter()
+                query_vectors.append(model.encode([query], normalize_embeddings=True)[0])
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            catalog = model.encode(documents, batch_size=options["batch_size"], normalize_embeddings=True)
+            elapsed = time.perf_counter() - start
+            vectors[backend] = (np.asarray(query_vectors), np.asarray(catalog))
+
+            latencies.sort()
+            self.stdout.write(
+                f"  {backend:<11} query p50={statistics.median(latencies) * 1e3:7.2f} ms  "
+                f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1e3:7.2f} ms  "
+                f"catalog {len(documents) / elapsed:8.1f} products/s"
+            )
+
+        fp32_queries, fp32_catalog = vectors["torch"]
+        int8_queries, int8_catalog = vectors["torch-int8"]
+        cosine = np.concatenate([(fp32_queries * int8_queries).sum(1), (fp32_catalog * int8_catalog).sum(1)])
+        self.stdout.write(
+            f"  cosine(fp32, int8): mean={cosine.mean():.5f}  min={cosine.min():.5f}  "
+            f"p1={np.percentile(cosine, 1):.5f}"
+        )
+
+        # Stored product vectors stay fp32 until reindexed: compare int8
+        # queries against them with the all-fp32 ranking.
+        k = min(TOP_K, len(documents))
+        expected = np.argsort(-(fp32_queries @ fp32_catalog.T), axis=1)[:, :k]
+        mixed = np.argsort(-(int8_queries @ fp32_catalog.T), axis=1)[:, :k]
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, mixed)])
+        self.stdout.write(f"  top-{k} overlap (int8 query vs fp32 catalog): {overlap:.3f}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Done"))
@@ -0,0 +1,106 @@
+"""
+Per-page cost of resolving product image URLs: the old per-image
+storage.url() + build_absolute_uri() vs the memoized absolute_media_url().
+Images are synthetic names on the Product.image field, so every URL goes
+through default_storage.url() (seeded products have no image at all).
+Run: python manage.py bench_media_urls --sizes 8,100 --names 1000
+(set CLOUDINARY_URL to measure the Cloudinary storage backend)
+"""
+import time
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models.fields.files import ImageFieldFile
+from rest_framework.test import APIRequestFactory
+
+from base.models import Product
+from base.utils import media
+from base.utils.media import FALLBACK_PATH, absolute_media_url, absolute_media_urls
+
+
+def _unmemoized_url(image_field, request=None):
+    """absolute_media_url as it was before memoization (the baseline)."""
+    if not image_field:
+        path = FALLBACK_PATH
+    else:
+        try:
+            url = image_field.url
+        except (ValueError, AttributeError):
+            url = FALLBACK_PATH
+        if url.startswith("http://") or url.startswith("https://"):
+            return url
+        path = url if url.startswith("/") else f"/{url}"
+    if request is not None:
+        return request.build_absolute_uri(path)
+    base = getattr(settings, "BACKEND_BASE_URL", "").rstrip("/")
+    return f"{base}{path}" if base else path
+
+
+def _clear():
+    media._storage_path.cache_clear()
+    media._join.cache_clear()
+
+
+class Command(BaseCommand):
+    help = "Benchmark absolute_media_url per page: unmemoized vs memoized vs bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="8,100")
+        parser.add_argument("--pages", type=int, default=2000)
+        parser.add_argument("--names", type=int, default=1000, help="Distinct image names")
+
+    def handle(self, *args, **options):
+        request = APIRequestFactory().get("/api/products/")
+        field = Product._meta.get_field("image")
+        if getattr(field.storage, "_wrapped", field.storage) is not getattr(default_storage, "_wrapped", default_storage):
+            raise CommandError("Product.image does not use default_storage")
+        # Upload-style names; some need IRI quoting like real customer uploads.
+        images = [
+            ImageFieldFile(Product(), field, f"products/{'photo ' if i % 10 == 0 else ''}bench-{i}.jpg")
+            for i in range(options["names"])
+        ]
+        if not images:
+            raise CommandError("--names must be at least 1")
+
+        _clear()
+        urls = absolute_media_urls(images, request)
+        storage_backed = sum(not url.endswith(FALLBACK_PATH) for url in urls)
+        if storage_backed != len(images) or media._storage_path.cache_info().misses != len(images):
+            raise CommandError(
+                f"Only {storage_backed} of {len(images)} images resolved through storage.url(); "
+                "the benchmark would be measuring the placeholder"
+            )
+
+        for req in (request, None):
+            expected = [_unmemoized_url(image, req) for image in images]
+            if [absolute_media_url(image, req) for image in images] != expected:
+                raise CommandError("absolute_media_url differs from the unmemoized resolution")
+            if absolute_media_urls(images, req) != expected:
+                raise CommandError("absolute_media_urls differs from the unmemoized resolution")
+        self.stdout.write(f"✅ Identical URLs for {len(images)} images, with and without a request")
+        storage = getattr(default_storage, "_wrapped", default_storage)
+        self.stdout.write(
+            f"Storage: {type(storage).__module__}.{type(storage).__name__} "
+            f"({len(images)} distinct names, e.g. {urls[1]})"
+        )
+
+        cases = (
+            ("unmemoized (before)", lambda page: [_unmemoized_url(i, request) for i in page], False),
+            ("memoized, cold", lambda page: [absolute_media_url(i, request) for i in page], True),
+            ("memoized, warm", lambda page: [absolute_media_url(i, request) for i in page], False),
+            ("bulk, warm", lambda page: absolute_media_urls(page, request), False),
+        )
+        for size in (int(s) for s in options["sizes"].split(",") if s.strip()):
+            page = list(islice(cycle(images), size))
+            self.stdout.write(f"{size}-image page, {options['pages']} pages")
+            for label, resolve, cold in cases:
+                resolve(page)
+                start = time.perf_counter()
+                for _ in range(options["pages"]):
+                    if cold:
+                        _clear()
+                    resolve(page)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"  {label:<22} {elapsed / options['pages'] * 1e6:9.1f} µs/page")
@@ -0,0 +1,90 @@
+"""
+Compare product card rendering: ProductSerializer / ProductListSerializer vs
+the product_cards() fast path (instances and .values() rows).
+Run: python manage.py bench_product_serializer --sizes 8,100,1000
+"""
+import time
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from rest_framework.test import APIRequestFactory
+
+from base.models import Product, Review
+from base.serializers import (
+    PRODUCT_CARD_VALUES,
+    ProductListSerializer,
+    ProductSerializer,
+    product_cards,
+)
+
+
+def _rate(render, items, min_seconds):
+    """Products rendered per second, repeating `render` for at least `min_seconds`."""
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        render(items)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return rounds * len(items) / elapsed
+
+
+class Command(BaseCommand):
+    help = "Benchmark product_cards() against the DRF product serializers and check identical output"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="8,100,1000")
+        parser.add_argument("--min-seconds", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        request = APIRequestFactory().get("/api/products/")
+        largest = max(sizes)
+
+        products = list(
+            Product.objects.select_related("category", "brand")
+            .prefetch_related(Prefetch("review_set", queryset=Review.objects.all()))
+            .order_by("-_id")[:largest]
+        )
+        if not products:
+            self.stdout.write(self.style.WARNING("No products found; run seed_products first."))
+            return
+        rows = {row["_id"]: row for row in Product.objects.filter(
+            _id__in=[p._id for p in products]
+        ).values(*PRODUCT_CARD_VALUES)}
+        rows = [rows[p._id] for p in products]
+
+        # Equality first: a fast path that drifts from the serializer is a bug.
+        expected = ProductListSerializer(products, many=True, context={"request": request}).data
+        expected = [dict(card) for card in expected]
+        for label, actual in (
+            ("instances", product_cards(products, request)),
+            ("values rows", product_cards(rows, request)),
+        ):
+            if actual != expected or [list(c) for c in actual] != [list(c) for c in expected]:
+                raise CommandError(f"product_cards({label}) differs from ProductListSerializer")
+        detail = ProductSerializer(products, many=True, context={"request": request}).data
+        if [{k: v for k, v in card.items() if k != "reviews"} for card in detail] != expected:
+            raise CommandError("ProductSerializer cards (minus reviews) differ from ProductListSerializer")
+        self.stdout.write(f"✅ Output identical for {len(products)} products")
+
+        cases = (
+            ("ProductSerializer (reviews prefetched)",
+             lambda items: ProductSerializer(items, many=True, context={"request": request}).data, products),
+            ("ProductListSerializer",
+             lambda items: ProductListSerializer(items, many=True, context={"request": request}).data, products),
+            ("product_cards(instances)", lambda items: product_cards(items, request), products),
+            ("product_cards(values rows)", lambda items: product_cards(items, request), rows),
+        )
+        for size in sizes:
+            self.stdout.write(f"{size} items")
+            baseline = None
+            for label, render, source in cases:
+                items = list(islice(cycle(source), size))
+                rate = _rate(render, items, options["min_seconds"])
+                if label == "ProductListSerializer":
+                    baseline = rate
+                speedup = f"  x{rate / baseline:5.1f}" if baseline else ""
+                self.stdout.write(f"  {label:<40} {rate:12,.0f} products/s{speedup}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.services.reviews import rebuild_review_aggregates
+
+
+class Command(BaseCommand):
+    help = "Rebuild product numReviews/ratingTotal/rating from the Review table (repair tool)"
+
+    def handle(self, *args, **options):
+        updated = rebuild_review_aggregates()
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt review aggregates for {updated} products"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.services.rankings import refresh_product_rankings
+
+
+class Command(BaseCommand):
+    help = "Rebuild best-seller and featured ranks (same job the Celery beat schedule runs)"
+
+    def handle(self, *args, **options):
+        ranked = refresh_product_rankings()
+        self.stdout.write(self.style.SUCCESS(f"✅ Ranked {ranked} products"))
@@ -1,38 +1,53 @@
 from django.core.management.base import BaseCommand
-from sentence_transformers import SentenceTransformer
+
+from base.ai.embedding import embed_texts
+from base.ai.vector_index import mark_vector_index_stale
 from base.models import Product
+from base.services.embeddings import refresh_dirty_embeddings
 
 class Command(BaseCommand):
     help = "Generate embeddings for all products"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dirty",
+            action="store_true",
+            help="Only refresh products queued by edits (what the Celery job does)",
+        )
+
     def handle(self, *args, **options):
-        model = SentenceTransformer("all-MiniLM-L6-v2")
+        if options["dirty"]:
+            count = refresh_dirty_embeddings()
+            self.stdout.write(self.style.SUCCESS(f"✅ Done. Re-embedded: {count}"))
+            return
 
         qs = Product.objects.select_related("category", "brand").all()
         batch_size = 64
 
         products = []
-        texts = []
 
         count = 0
         for p in qs.iterator(chunk_size=500):
             products.append(p)
-            texts.append(p.embedding_text())
 
             if len(products) >= batch_size:
-                vectors = model.encode(texts, normalize_embeddings=True)
-                for prod, vec in zip(products, vectors):
-                    prod.embedding = vec.tolist()
-                Product.objects.bulk_update(products, ["embedding"])
+                self._index(products)
                 count += len(products)
                 self.stdout.write(f"✅ Indexed {count} products")
-                products, texts = [], []
+                products = []
 
         if products:
-            vectors = model.encode(texts, normalize_embeddings=True)
-            for prod, vec in zip(products, vectors):
-                prod.embedding = vec.tolist()
-            Product.objects.bulk_update(products, ["embedding"])
+            self._index(products)
             count += len(products)
 
+        # Same hashes, new vectors (e.g. a different model): reload everything.
+        mark_vector_index_stale(full=True)
         self.stdout.write(self.style.SUCCESS(f"✅ Done. Total indexed: {count}"))
+
+    def _index(self, products):
+        vectors = embed_texts(p.embedding_text() for p in products)
+        for prod, vec in zip(products, vectors):
+            prod.embedding = vec
+            prod.embeddingHash = prod.embedding_hash()
+            prod.embeddingDirty = 0
+        Product.objects.bulk_update(products, ["embedding", "embeddingHash", "embeddingDirty"])
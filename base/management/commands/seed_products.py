@@ -240,6 +240,7 @@ class Command(BaseCommand):
                     "countInStock": data["countInStock"],
                     "rating": data["rating"],
                     "numReviews": data["numReviews"],
+                    "ratingTotal": int(round(data["rating"] * data["numReviews"])),
                 },
             )
             if was_created:
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from base.services.catalog_warm import WARM_TOP_N, warm_catalog_cache
+
+
+class Command(BaseCommand):
+    help = "Re-render the hottest cached catalog pages (same cycle the Celery warmer runs)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=WARM_TOP_N)
+
+    def handle(self, *args, **options):
+        counts = warm_catalog_cache(options["top"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Warmed {counts['warmed']} pages "
+                f"({counts['fresh']} already fresh, {counts['skipped']} skipped)"
+            )
+        )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+import django.db.models.expressions
+import django.db.models.functions.math
+import django.db.models.lookups
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_order_confirmationemailsent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='discountedPrice',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discountPercentage__isnull=True, then=models.F('price')), default=django.db.models.expressions.CombinedExpression(models.Case(models.When(django.db.models.lookups.GreaterThan(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage'))), '-', django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage'))))), models.Value(Decimal('0.5'))), then=django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage')))), '+', models.Value(1))), models.When(django.db.models.lookups.LessThan(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage'))), '-', django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage'))))), models.Value(Decimal('0.5'))), then=django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage'))))), default=django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(models.F('price'), '*', django.db.models.expressions.CombinedExpression(models.Value(Decimal('100')), '-', models.F('discountPercentage')))), '+', models.Value(1)), '/', models.Value(2))), '*', models.Value(2)), output_field=models.DecimalField(decimal_places=2, max_digits=20)), '/', models.Value(Decimal('100'))), output_field=models.DecimalField(decimal_places=2, max_digits=15)), output_field=models.DecimalField(decimal_places=2, max_digits=15, null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.OrderBy(models.F('createdAt'), descending=True), models.OrderBy(models.F('_id'), descending=True), condition=models.Q(('discountedPrice__lt', models.F('price'))), name='product_discounted_idx'),
+        ),
+    ]
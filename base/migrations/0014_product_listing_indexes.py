@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:33
+
+from django.db import migrations, models
+
+
+# Postgres-only listing indexes: SQLite rejects NULLS LAST in CREATE INDEX,
+# and keyset pagination orders nullable columns DESC NULLS LAST.
+NULLS_LAST_INDEXES = {
+    "product_reviews_idx": '("numReviews" DESC NULLS LAST, "_id" DESC)',
+    "product_rating_idx": '("rating" DESC NULLS LAST, "_id" DESC)',
+    "product_price_desc_idx": '("price" DESC NULLS LAST, "_id" DESC)',
+}
+
+
+def create_postgres_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    for name, columns in NULLS_LAST_INDEXES.items():
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON "base_product" {columns};')
+
+    # GIN trigram index for `name__icontains` (needs the pg_trgm extension).
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    # icontains compiles to UPPER("name"::text) LIKE UPPER(%s), so index that expression.
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON "base_product" '
+        'USING gin ((UPPER("name"::text)) gin_trgm_ops);'
+    )
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in [*NULLS_LAST_INDEXES, "product_name_trgm_idx"]:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_product_discountedprice'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.OrderBy(models.F('createdAt'), descending=True), models.OrderBy(models.F('_id'), descending=True), name='product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.OrderBy(models.F('price')), models.OrderBy(models.F('_id')), name='product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('category'), models.OrderBy(models.F('createdAt'), descending=True), models.OrderBy(models.F('_id'), descending=True), name='product_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.F('brand'), models.OrderBy(models.F('createdAt'), descending=True), models.OrderBy(models.F('_id'), descending=True), name='product_brand_created_idx'),
+        ),
+        migrations.RunPython(create_postgres_indexes, drop_postgres_indexes),
+    ]
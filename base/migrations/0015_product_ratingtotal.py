@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:37
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def backfill_rating_total(apps, schema_editor):
+    """Exact sums where Review rows exist, otherwise rating * numReviews."""
+    Product = apps.get_model("base", "Product")
+    Review = apps.get_model("base", "Review")
+    review_sums = (
+        Review.objects.filter(product=OuterRef("pk"))
+        .order_by()
+        .values("product")
+        .annotate(total=Sum("rating"))
+        .values("total")
+    )
+    derived = Cast(
+        Round(Coalesce("rating", Value(Decimal("0"))) * Coalesce("numReviews", 0)),
+        IntegerField(),
+    )
+    Product.objects.update(ratingTotal=Coalesce(Subquery(review_sums), derived))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_product_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='ratingTotal',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_total, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_product_ratingtotal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='embeddingDirty',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='embeddingHash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('embeddingDirty__gt', 0)), fields=['_id'], name='product_embedding_dirty_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:08
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Same weighting as base.services.search.search_document(), in plain SQL so
+# the migration does not depend on application code.
+BACKFILL_SQL = """
+UPDATE base_product AS p
+SET "searchDocument" =
+    setweight(to_tsvector('english', COALESCE(p.name, '')), 'A')
+    || setweight(to_tsvector('english', COALESCE(b.name, '')), 'B')
+    || setweight(to_tsvector('english', COALESCE(c.name, '')), 'C')
+    || setweight(to_tsvector('english', COALESCE(p.description, '')), 'D')
+FROM base_product AS src
+LEFT JOIN base_brand AS b ON b.id = src.brand_id
+LEFT JOIN base_category AS c ON c.id = src.category_id
+WHERE src._id = p._id
+"""
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_search_idx ON "base_product" USING gin ("searchDocument");'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_search_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_product_embedding_refresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='searchDocument',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_product_searchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRanking',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking', serialize=False, to='base.product')),
+                ('unitsSold', models.IntegerField(default=0)),
+                ('bestSellerRank', models.IntegerField()),
+                ('featuredRank', models.IntegerField()),
+                ('updatedAt', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bestSellerRank'], name='ranking_best_seller_idx'), models.Index(fields=['featuredRank'], name='ranking_featured_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:42
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0018_productranking'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'base_manager_name': 'objects'},
+        ),
+    ]
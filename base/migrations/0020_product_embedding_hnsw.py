@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def create_hnsw_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # pgvector's default build parameters, spelled out so they are visible.
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS product_embedding_hnsw_idx ON base_product "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64);"
+    )
+
+
+def drop_hnsw_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_embedding_hnsw_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0019_product_manager'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_hnsw_index, drop_hnsw_index),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# Keyword filtering on Postgres now goes through the searchDocument GIN
+# index; nothing runs name__icontains there, so the trigram index from
+# 0014 only slowed down product writes.
+def drop_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS product_name_trgm_idx;")
+
+
+def create_trgm_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm_idx ON "base_product" '
+        'USING gin ((UPPER("name"::text)) gin_trgm_ops);'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0020_product_embedding_hnsw'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_trgm_index, create_trgm_index),
+    ]
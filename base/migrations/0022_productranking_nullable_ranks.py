@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:16
+
+from django.db import migrations, models
+
+
+def add_missing_rankings(apps, schema_editor):
+    # Products created since the last refresh get an unranked row so the
+    # rank-ordered listings (INNER JOIN) keep showing them.
+    Product = apps.get_model("base", "Product")
+    ProductRanking = apps.get_model("base", "ProductRanking")
+    missing = Product.objects.filter(ranking__isnull=True).values_list("pk", flat=True)
+    ProductRanking.objects.bulk_create(
+        (ProductRanking(product_id=pk) for pk in missing.iterator()),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def remove_unranked(apps, schema_editor):
+    ProductRanking = apps.get_model("base", "ProductRanking")
+    ProductRanking.objects.filter(bestSellerRank__isnull=True).delete()
+    ProductRanking.objects.filter(featuredRank__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0021_drop_product_name_trgm_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productranking',
+            name='bestSellerRank',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='productranking',
+            name='featuredRank',
+            field=models.IntegerField(null=True),
+        ),
+        migrations.RunPython(add_missing_rankings, remove_unranked),
+    ]
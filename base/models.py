@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 # Create your models here.
 # Create your models here.
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from pgvector.django import VectorField
 
 class Brand(models.Model):
@@ -26,7 +27,57 @@ class Category(models.Model):
 
 from django.db.models import DecimalField
 
+import hashlib
 from decimal import Decimal, InvalidOperation
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Floor
+from django.db.models.lookups import GreaterThan, LessThan
+
+
+def discounted_price_expression():
+    """
+    SQL twin of `Product.discount_price`.
+
+    round(Decimal, 2) rounds half to even, while SQL ROUND() rounds half away
+    from zero, so the rounding is spelled out on the price in cents:
+    price - price * pct / 100 == price * (100 - pct) / 100.
+    """
+    cents = F("price") * (Value(Decimal("100")) - F("discountPercentage"))
+    whole = Floor(cents)
+    fraction = cents - whole
+    half = Value(Decimal("0.5"))
+    rounded = Case(
+        When(GreaterThan(fraction, half), then=whole + 1),
+        When(LessThan(fraction, half), then=whole),
+        # Exactly half a cent: pick the even neighbour.
+        default=Floor((whole + 1) / 2) * 2,
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+    return Case(
+        When(discountPercentage__isnull=True, then=F("price")),
+        default=rounded / Value(Decimal("100")),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+# Columns no listing, order or admin page reads: a 384-float vector and the
+# full-text document. Only SQL (distance, @@) and the encoder use them.
+PRODUCT_DEFERRED_FIELDS = ("embedding", "searchDocument")
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_embedding(self):
+        """
+        Also load `embedding` (vector index builds, similarity in Python).
+        Clears other defer() calls, so chain only()/defer() after it.
+        """
+        return self.defer(None).defer("searchDocument")
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().defer(*PRODUCT_DEFERRED_FIELDS)
+
 
 class Product(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -37,6 +88,8 @@ class Product(models.Model):
     description = models.TextField(null=True, blank=True)
     rating = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
     numReviews = models.IntegerField(null=True, blank=True, default=0)
+    # Sum of review ratings, maintained with F() updates next to numReviews.
+    ratingTotal = models.IntegerField(default=0)
     price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     discountPercentage = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     
@@ -44,12 +97,101 @@ class Product(models.Model):
     createdAt = models.DateTimeField(auto_now_add=True)
     _id = models.AutoField(primary_key=True, editable=False)
     embedding = VectorField(dimensions=384, null=True, blank=True)
+    # sha256 of the embedding_text() that `embedding` was computed from.
+    embeddingHash = models.CharField(max_length=64, null=True, blank=True, editable=False)
+    # Pending-change counter: bumped when the embedding text may have changed,
+    # reset to 0 by the batched refresh (see base.services.embeddings).
+    embeddingDirty = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted full-text document, kept current by base.services.search
+    # (GIN index is created in migration 0017, Postgres only).
+    searchDocument = SearchVectorField(null=True, editable=False)
+    # Stored copy of `discount_price` so discount listings filter/sort in SQL.
+    discountedPrice = models.GeneratedField(
+        expression=discounted_price_expression(),
+        output_field=models.DecimalField(max_digits=15, decimal_places=2, null=True),
+        db_persist=True,
+    )
+
+    objects = ProductManager()
+
+    class Meta:
+        # Related lookups (order_item.product, review.product) defer too.
+        base_manager_name = "objects"
+        # One B-tree per listing ordering, each ending in the `_id` tiebreaker.
+        # The DESC NULLS LAST indexes for rating/numReviews/price are created
+        # in migration 0014 on Postgres only (SQLite rejects NULLS LAST here).
+        indexes = [
+            models.Index(F("createdAt").desc(), F("_id").desc(), name="product_created_idx"),
+            models.Index(F("price").asc(), F("_id").asc(), name="product_price_idx"),
+            models.Index(
+                F("category"), F("createdAt").desc(), F("_id").desc(), name="product_cat_created_idx"
+            ),
+            models.Index(
+                F("brand"), F("createdAt").desc(), F("_id").desc(), name="product_brand_created_idx"
+            ),
+            models.Index(
+                F("createdAt").desc(),
+                F("_id").desc(),
+                name="product_discounted_idx",
+                condition=Q(discountedPrice__lt=F("price")),
+            ),
+            models.Index(
+                fields=["_id"], name="product_embedding_dirty_idx", condition=Q(embeddingDirty__gt=0)
+            ),
+        ]
 
     def embedding_text(self):
         category_name = self.category.name if self.category else ""
         brand_name = self.brand.name if self.brand else ""
         return f"{self.name}. {brand_name}. {category_name}. {self.description or ''}"
 
+    def embedding_hash(self):
+        return hashlib.sha256(self.embedding_text().encode()).hexdigest()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _remember_values(self, fields=None):
+        """Record current values as the DB state (after save / refresh)."""
+        deferred = self.get_deferred_fields()
+        loaded = getattr(self, "_loaded_values", {})
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred or (fields is not None and field.name not in fields):
+                continue
+            loaded[field.attname] = getattr(self, field.attname)
+        self._loaded_values = loaded
+
+    def _field_names(self, names):
+        return None if names is None else {self._meta.get_field(name).name for name in names}
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_values(self._field_names(kwargs.get("update_fields")))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None, **kwargs):
+        if from_queryset is None:
+            # only(*fields) on the deferring base manager would select every
+            # column and overwrite unsaved edits, so start from no deferral.
+            from_queryset = type(self)._base_manager.db_manager(using, hints={"instance": self}).defer(None)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset, **kwargs)
+        self._remember_values(self._field_names(fields))
+
+    def changed_fields(self, names):
+        """
+        Which of the field `names` differ from the values loaded from the DB.
+        Unsaved instances, and fields that were deferred, count as changed.
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        changed = set()
+        for name in names:
+            attname = self._meta.get_field(name).attname
+            if attname not in loaded or getattr(self, attname) != loaded[attname]:
+                changed.add(name)
+        return changed
+
 
     def __str__(self):
         return self.name
@@ -70,6 +212,32 @@ class Product(models.Model):
 
 
 
+class ProductRanking(models.Model):
+    """
+    Precomputed listing positions (1 = first), rebuilt periodically by
+    base.services.rankings so listings read an index instead of sorting.
+    """
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="ranking"
+    )
+    # Units sold in paid orders.
+    unitsSold = models.IntegerField(default=0)
+    # NULL for products created since the last refresh: they trail the
+    # ranked listings (live order among themselves) until it runs.
+    bestSellerRank = models.IntegerField(null=True)
+    featuredRank = models.IntegerField(null=True)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["bestSellerRank"], name="ranking_best_seller_idx"),
+            models.Index(fields=["featuredRank"], name="ranking_featured_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: #{self.bestSellerRank}"
+
+
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -1,9 +1,12 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.utils import timezone
 from rest_framework_simplejwt.tokens import RefreshToken
 from .models import Product, Order, OrderItem, ShippingAddress, Review
 from base.models import Category
-from base.utils.media import absolute_media_url
+from base.utils.media import absolute_media_url, media_origin
 
 from .models import Brand
 class UserSerializer(serializers.ModelSerializer):
@@ -57,6 +60,17 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = '__all__'
     
+# Internal columns (search vectors, stored aggregates, refresh bookkeeping).
+PRODUCT_INTERNAL_FIELDS = (
+    "embedding",
+    "embeddingHash",
+    "embeddingDirty",
+    "searchDocument",
+    "discountedPrice",
+    "ratingTotal",
+)
+
+
 class ProductSerializer(serializers.ModelSerializer):
     category = CategorySerializer()
     brand = BrandSerializer()
@@ -66,7 +80,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        exclude = ("embedding",)
+        exclude = PRODUCT_INTERNAL_FIELDS
     def get_reviews(self, obj):
         reviews = obj.review_set.all()
         serializer = ReviewSerializer(reviews, many=True)
@@ -79,7 +93,144 @@ class ProductSerializer(serializers.ModelSerializer):
         return data
 
 
+class SparseFieldsMixin:
+    """Keep only the fields named in context["fields"] (the `fields=` query param)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get("fields")
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Listing/search card: ProductSerializer without the nested reviews (no per-row query)."""
+    category = CategorySerializer()
+    brand = BrandSerializer()
+    discount_price = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Product
+        exclude = PRODUCT_INTERNAL_FIELDS
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if "image" in data:
+            data["image"] = absolute_media_url(instance.image, self.context.get("request"))
+        return data
+
+
+# Fast path for ProductListSerializer: the same dicts, built without DRF's
+# per-field machinery. The tests check it against the serializer field for field.
+PRODUCT_CARD_FIELDS = (
+    "_id", "category", "brand", "discount_price", "name", "image", "description", "rating",
+    "numReviews", "price", "discountPercentage", "countInStock", "createdAt", "user",
+)
+# `.values(*PRODUCT_CARD_VALUES)` rows are accepted in place of instances.
+PRODUCT_CARD_VALUES = (
+    "_id", "name", "image", "description", "rating", "numReviews", "price",
+    "discountPercentage", "countInStock", "createdAt", "user_id",
+    "category__name", "category__slug", "category__icon_class",
+    "brand__name", "brand__slug", "brand__icon_class",
+)
+_CENT = Decimal("0.01")
+_image_field = Product._meta.get_field("image")
+
+
+def _decimal(value):
+    # DecimalField(decimal_places=2) with COERCE_DECIMAL_TO_STRING.
+    if value is None:
+        return None
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value).strip())
+    return "{:f}".format(value.quantize(_CENT))
+
+
+def _datetime(value, tz):
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def _taxonomy(obj):
+    if obj is None:
+        return None
+    return {"name": obj.name, "slug": obj.slug, "icon_class": obj.icon_class}
+
+
+def _row_taxonomy(row, prefix):
+    if row[f"{prefix}__slug"] is None:
+        return None
+    return {
+        "name": row[f"{prefix}__name"],
+        "slug": row[f"{prefix}__slug"],
+        "icon_class": row[f"{prefix}__icon_class"],
+    }
+
+
+def product_card(product, request=None, fields=None):
+    """
+    ProductListSerializer(product).data for a Product (with category/brand
+    selected) or a `.values(*PRODUCT_CARD_VALUES)` row, honouring `fields`.
+    """
+    return _card(product, request, fields, timezone.get_current_timezone(), media_origin(request))
+
+
+def _card(product, request, fields, tz, origin):
+    if isinstance(product, dict):
+        discount = product["discountPercentage"]
+        price = product["price"]
+        # Same arithmetic as Product.discount_price.
+        discount_price = price
+        if price and discount is not None:
+            discount_price = round(price - (price * discount / 100), 2)
+        card = {
+            "_id": product["_id"],
+            "category": _row_taxonomy(product, "category"),
+            "brand": _row_taxonomy(product, "brand"),
+            "discount_price": discount_price,
+            "name": product["name"],
+            "image": absolute_media_url(
+                _image_field.attr_class(None, _image_field, product["image"]), request, origin
+            ),
+            "description": product["description"],
+            "rating": _decimal(product["rating"]),
+            "numReviews": product["numReviews"],
+            "price": _decimal(price),
+            "discountPercentage": _decimal(discount),
+            "countInStock": product["countInStock"],
+            "createdAt": _datetime(product["createdAt"], tz),
+            "user": product["user_id"],
+        }
+    else:
+        card = {
+            "_id": product._id,
+            "category": _taxonomy(product.category),
+            "brand": _taxonomy(product.brand),
+            "discount_price": product.discount_price,
+            "name": product.name,
+            "image": absolute_media_url(product.image, request, origin),
+            "description": product.description,
+            "rating": _decimal(product.rating),
+            "numReviews": product.numReviews,
+            "price": _decimal(product.price),
+            "discountPercentage": _decimal(product.discountPercentage),
+            "countInStock": product.countInStock,
+            "createdAt": _datetime(product.createdAt, tz),
+            "user": product.user_id,
+        }
+    if fields:
+        return {name: value for name, value in card.items() if name in fields}
+    return card
+
 
+def product_cards(products, request=None, fields=None):
+    """product_card() for each item; a drop-in for ProductListSerializer(..., many=True).data."""
+    tz = timezone.get_current_timezone()
+    origin = media_origin(request)
+    return [_card(product, request, fields, tz, origin) for product in products]
 
 
 class ShippingAddressSerializer(serializers.ModelSerializer):
@@ -0,0 +1,90 @@
+import io
+import logging
+import sys
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+
+from base.utils.catalog_cache import WARM_META_KEY, flush_hit_counts, hot_entries
+from base.utils.task_dispatch import enqueue_background
+
+logger = logging.getLogger(__name__)
+
+# Hot pages re-rendered per warm cycle.
+WARM_TOP_N = 50
+# Bumps within this window (an admin editing several products) share one cycle.
+WARM_DELAY = 10
+_SCHEDULED_KEY = "catalog:warm:scheduled"
+
+
+def schedule_catalog_warm() -> None:
+    from base.tasks import warm_catalog_cache_task
+
+    if cache.add(_SCHEDULED_KEY, 1, WARM_DELAY):
+        enqueue_background(warm_catalog_cache_task, countdown=WARM_DELAY)
+
+
+def replay_request(entry) -> WSGIRequest:
+    """A GET for a hot_entries() item, as the WSGI handler would build it."""
+    host, secure = entry["host"], entry["secure"]
+    server_name, port = host, "443" if secure else "80"
+    if ":" in host and host.rsplit(":", 1)[1].isdigit():
+        server_name, _, port = host.rpartition(":")
+    return WSGIRequest({
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        # WSGI carries the path as UTF-8 bytes decoded as latin-1.
+        "PATH_INFO": entry["path"].encode().decode("iso-8859-1"),
+        "QUERY_STRING": entry["query"],
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": port,
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "HTTP_HOST": host,
+        "HTTP_ACCEPT": entry["accept"] or "application/json",
+        "HTTP_ACCEPT_ENCODING": "gzip",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "https" if secure else "http",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        WARM_META_KEY: True,
+    })
+
+
+def warm_catalog_cache(limit: int = WARM_TOP_N) -> dict:
+    """
+    Replay the `limit` hottest cached_catalog requests through their views.
+
+    Entries that are still fresh come back as cheap hits; outdated ones are
+    recomputed (under the usual single-flight lock) so the next visitor
+    gets a hit instead of paying for the query and serialization.
+    """
+    flush_hit_counts()
+    counts = {"warmed": 0, "fresh": 0, "skipped": 0}
+    for item in hot_entries(limit):
+        try:
+            match = resolve(item["path"])
+        except Resolver404:
+            counts["skipped"] += 1
+            continue
+
+        url = f"{item['path']}?{item['query']}" if item["query"] else item["path"]
+        request = replay_request(item)
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception("Warming %s failed", url)
+            counts["skipped"] += 1
+            continue
+
+        state = response.get("X-Cache")
+        if state == "MISS":
+            counts["warmed"] += 1
+        elif state == "HIT":
+            counts["fresh"] += 1
+        else:
+            counts["skipped"] += 1
+    return counts
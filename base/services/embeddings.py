@@ -0,0 +1,78 @@
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from base.ai.embedding import embed_texts
+from base.ai.vector_index import mark_vector_index_stale
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_SIZE = 64
+# Marks arriving within this window share one queued refresh.
+EMBEDDING_REFRESH_DELAY = 30
+_SCHEDULED_KEY = "embedding:refresh:scheduled"
+
+
+def mark_embeddings_dirty(queryset) -> int:
+    """Flag products whose embedding text may have changed and queue a refresh."""
+    updated = queryset.update(embeddingDirty=F("embeddingDirty") + 1)
+    if updated:
+        transaction.on_commit(schedule_embedding_refresh)
+    return updated
+
+
+def schedule_embedding_refresh() -> None:
+    from base.tasks import refresh_product_embeddings_task
+    from base.utils.task_dispatch import enqueue_background
+
+    if cache.add(_SCHEDULED_KEY, 1, EMBEDDING_REFRESH_DELAY):
+        enqueue_background(refresh_product_embeddings_task, countdown=EMBEDDING_REFRESH_DELAY)
+
+
+def refresh_dirty_embeddings(batch_size: int = EMBEDDING_BATCH_SIZE) -> int:
+    """
+    Re-embed dirty products in batches and return how many were encoded.
+
+    A product is only encoded when the hash of its current text differs
+    from embeddingHash. Each write is conditional on the dirty counter it
+    read, so a change that lands mid-batch keeps the row dirty for the next
+    run instead of being overwritten with a vector for the old text.
+    """
+    from base.models import Product
+
+    encoded = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Product.objects.select_related("category", "brand")
+            .filter(embeddingDirty__gt=0, pk__gt=last_pk)
+            .order_by("pk")[:batch_size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        hashes = {p.pk: p.embedding_hash() for p in batch}
+        stale = [p for p in batch if hashes[p.pk] != p.embeddingHash]
+        vectors = embed_texts(p.embedding_text() for p in stale) if stale else []
+        by_pk = {p.pk: vector for p, vector in zip(stale, vectors)}
+
+        with transaction.atomic():
+            for product in batch:
+                changes = {"embeddingDirty": 0}
+                if product.pk in by_pk:
+                    changes.update(embedding=by_pk[product.pk], embeddingHash=hashes[product.pk])
+                Product.objects.filter(
+                    pk=product.pk, embeddingDirty=product.embeddingDirty
+                ).update(**changes)
+        encoded += len(stale)
+
+    if encoded:
+        transaction.on_commit(mark_vector_index_stale)
+    if Product.objects.filter(embeddingDirty__gt=0).exists():
+        # Marked while this run was in flight.
+        cache.delete(_SCHEDULED_KEY)
+        schedule_embedding_refresh()
+    return encoded
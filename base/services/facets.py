@@ -0,0 +1,89 @@
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Value, When
+
+# Upper bounds of the price histogram buckets; the last bucket is open-ended.
+PRICE_BUCKET_EDGES = (50, 100, 250, 500, 1000)
+
+_CATEGORY = "category_pk, category_slug, category_name"
+_BRAND = "brand_pk, brand_slug, brand_name"
+
+# One pass over the filtered rows, all facets at once.
+GROUPING_SETS_SQL = f"""
+WITH f AS ({{inner}})
+SELECT CASE
+           WHEN GROUPING(category_pk) = 0 THEN 'category'
+           WHEN GROUPING(brand_pk) = 0 THEN 'brand'
+           WHEN GROUPING(price_bucket) = 0 THEN 'price'
+           ELSE 'total'
+       END,
+       {_CATEGORY}, {_BRAND}, price_bucket, COUNT(*)
+FROM f
+GROUP BY GROUPING SETS (({_CATEGORY}), ({_BRAND}), (price_bucket), ())
+"""
+
+# Same result for backends without GROUPING SETS (SQLite in local dev).
+UNION_ALL_SQL = f"""
+WITH f AS ({{inner}})
+SELECT 'category', {_CATEGORY}, NULL, NULL, NULL, NULL, COUNT(*) FROM f GROUP BY {_CATEGORY}
+UNION ALL
+SELECT 'brand', NULL, NULL, NULL, {_BRAND}, NULL, COUNT(*) FROM f GROUP BY {_BRAND}
+UNION ALL
+SELECT 'price', NULL, NULL, NULL, NULL, NULL, NULL, price_bucket, COUNT(*) FROM f GROUP BY price_bucket
+UNION ALL
+SELECT 'total', NULL, NULL, NULL, NULL, NULL, NULL, NULL, COUNT(*) FROM f
+"""
+
+
+def _price_bucket():
+    whens = [When(price__lt=edge, then=Value(i)) for i, edge in enumerate(PRICE_BUCKET_EDGES)]
+    whens.append(When(price__isnull=False, then=Value(len(PRICE_BUCKET_EDGES))))
+    return Case(*whens, default=None, output_field=IntegerField())
+
+
+def product_facets(queryset) -> dict:
+    """
+    Category, brand and price-bucket counts for `queryset` in one query.
+
+    Returns {"total", "categories", "brands", "price"}; categories/brands are
+    ordered by count and skip products without one, price lists every bucket
+    (empty ones included) so the histogram has a stable shape.
+    """
+    inner = queryset.order_by().values(
+        category_pk=F("category_id"),
+        category_slug=F("category__slug"),
+        category_name=F("category__name"),
+        brand_pk=F("brand_id"),
+        brand_slug=F("brand__slug"),
+        brand_name=F("brand__name"),
+        price_bucket=_price_bucket(),
+    )
+    inner_sql, params = inner.query.sql_with_params()
+    template = GROUPING_SETS_SQL if connection.vendor == "postgresql" else UNION_ALL_SQL
+    with connection.cursor() as cursor:
+        cursor.execute(template.format(inner=inner_sql), params)
+        rows = cursor.fetchall()
+
+    total = 0
+    categories, brands = [], []
+    buckets = [0] * (len(PRICE_BUCKET_EDGES) + 1)
+    for facet, category_pk, category_slug, category_name, brand_pk, brand_slug, brand_name, bucket, count in rows:
+        if facet == "total":
+            total = count
+        elif facet == "category" and category_pk is not None:
+            categories.append({"id": category_pk, "slug": category_slug, "name": category_name, "count": count})
+        elif facet == "brand" and brand_pk is not None:
+            brands.append({"id": brand_pk, "slug": brand_slug, "name": brand_name, "count": count})
+        elif facet == "price" and bucket is not None:
+            buckets[bucket] = count
+
+    lower_bounds = (0,) + PRICE_BUCKET_EDGES
+    upper_bounds = PRICE_BUCKET_EDGES + (None,)
+    return {
+        "total": total,
+        "categories": sorted(categories, key=lambda c: (-c["count"], c["slug"])),
+        "brands": sorted(brands, key=lambda b: (-b["count"], b["slug"])),
+        "price": [
+            {"min": low, "max": high, "count": count}
+            for low, high, count in zip(lower_bounds, upper_bounds, buckets)
+        ],
+    }
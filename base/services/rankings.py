@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models import F, FloatField, Q, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, RowNumber
+
+from base.models import Product, ProductRanking
+from base.utils.catalog_cache import invalidate_catalog_tags
+
+# Featured score is a Bayesian average: every product starts as if it had
+# PRIOR_REVIEWS reviews of PRIOR_RATING, so one 5-star review does not beat
+# hundreds of 4.8s.
+PRIOR_REVIEWS = 5
+PRIOR_RATING = 3.5
+BATCH_SIZE = 1000
+# Catalog cache tag carried by every rank-ordered response.
+RANKINGS_TAG = "rankings"
+
+
+def _ranked_products():
+    units = Coalesce(Sum("orderitem__qty", filter=Q(orderitem__order__isPaid=True)), 0)
+    reviews = Coalesce(F("numReviews"), 0)
+    score = (
+        Cast(F("ratingTotal"), FloatField()) + Value(PRIOR_REVIEWS * PRIOR_RATING)
+    ) / (Cast(reviews, FloatField()) + Value(float(PRIOR_REVIEWS)))
+    return (
+        Product.objects.order_by()
+        .annotate(units=units, score=score)
+        .annotate(
+            best_seller=Window(
+                RowNumber(),
+                order_by=[F("units").desc(), F("numReviews").desc(nulls_last=True), F("_id").desc()],
+            ),
+            featured=Window(
+                RowNumber(),
+                order_by=[F("score").desc(), F("numReviews").desc(nulls_last=True), F("_id").desc()],
+            ),
+        )
+        .values_list("_id", "units", "best_seller", "featured")
+    )
+
+
+def refresh_product_rankings() -> int:
+    """
+    Recompute every product's best-seller rank (paid units sold, then
+    reviews) and featured rank (Bayesian rating) in one windowed query and
+    upsert them into ProductRanking. Returns the number of products ranked.
+    """
+    count = 0
+    with transaction.atomic():
+        batch = []
+        for pk, units, best_seller, featured in _ranked_products().iterator(chunk_size=BATCH_SIZE):
+            batch.append(
+                ProductRanking(
+                    product_id=pk, unitsSold=units, bestSellerRank=best_seller, featuredRank=featured
+                )
+            )
+            if len(batch) >= BATCH_SIZE:
+                count += _upsert(batch)
+                batch = []
+        count += _upsert(batch)
+        transaction.on_commit(lambda: invalidate_catalog_tags(RANKINGS_TAG))
+    return count
+
+
+def _upsert(rankings) -> int:
+    if not rankings:
+        return 0
+    ProductRanking.objects.bulk_create(
+        rankings,
+        update_conflicts=True,
+        unique_fields=["product"],
+        update_fields=["unitsSold", "bestSellerRank", "featuredRank", "updatedAt"],
+    )
+    return len(rankings)
@@ -0,0 +1,69 @@
+from django.db import connection, transaction
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce
+
+from base.models import Product, Review
+from base.utils.catalog_cache import (
+    invalidate_catalog_cache,
+    invalidate_catalog_tags,
+    listing_scope_tags,
+)
+
+
+def add_review(product, user, rating: int, comment: str) -> Review:
+    """
+    Insert a review and fold it into the product aggregates in O(1).
+
+    The single UPDATE reads the row's current counters (F expressions), so
+    concurrent reviews serialize on the row lock instead of overwriting
+    each other's averages.
+    """
+    count = Coalesce(F("numReviews"), 0) + 1
+    total = F("ratingTotal") + rating
+
+    with transaction.atomic():
+        review = Review.objects.create(
+            user=user,
+            product=product,
+            name=user.first_name,
+            rating=rating,
+            comment=comment,
+        )
+        Product.objects.filter(pk=product.pk).update(
+            numReviews=count,
+            ratingTotal=total,
+            rating=Cast(total, FloatField()) / count,
+        )
+        # .update() skips post_save, so bust the catalog cache explicitly.
+        tags = {f"product:{product.pk}", *listing_scope_tags(product)}
+        transaction.on_commit(lambda: invalidate_catalog_tags(*tags))
+
+    return review
+
+
+REBUILD_SQL = """
+UPDATE base_product AS p
+SET "numReviews" = agg.n,
+    "ratingTotal" = agg.total,
+    rating = CASE WHEN agg.n > 0 THEN agg.total * 1.0 / agg.n ELSE p.rating END
+FROM (
+    SELECT pr._id AS product_id, COUNT(r._id) AS n, COALESCE(SUM(r.rating), 0) AS total
+    FROM base_product pr
+    LEFT JOIN base_review r ON r.product_id = pr._id
+    GROUP BY pr._id
+) AS agg
+WHERE agg.product_id = p._id
+"""
+
+
+def rebuild_review_aggregates() -> int:
+    """
+    Recompute numReviews / ratingTotal / rating for every product from the
+    Review table in one set-based UPDATE. Products without reviews get zero
+    counters but keep their stored rating. Returns the number of rows updated.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+        updated = cursor.rowcount
+        transaction.on_commit(invalidate_catalog_cache)
+    return updated
@@ -0,0 +1,84 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = "english"
+# Top-K callers keep only this many best-ranked matches before joining,
+# ordering and serializing, however much of the catalog a term matches.
+SEARCH_CANDIDATES = 500
+
+# Product text that feeds Product.searchDocument, by weight (A ranks highest).
+SEARCH_FIELDS = {"name", "description", "brand", "category"}
+
+_words = re.compile(r"[^\W_]+")
+
+
+def search_document():
+    """
+    Weighted tsvector for a Product row: name (A) > brand (B) > category (C)
+    > description (D). Brand and category names come from subqueries so the
+    expression can be used in a plain UPDATE.
+    """
+    from base.models import Brand, Category
+
+    def related_name(model, fk):
+        return Subquery(model.objects.filter(pk=OuterRef(fk)).values("name")[:1])
+
+    # SearchVector coalesces NULL parts (no brand, no description) to ''.
+    return (
+        SearchVector("name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(related_name(Brand, "brand_id"), weight="B", config=SEARCH_CONFIG)
+        + SearchVector(related_name(Category, "category_id"), weight="C", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_documents(queryset) -> int:
+    """Recompute searchDocument for `queryset` in one UPDATE (Postgres only)."""
+    if connections[queryset.db].vendor != "postgresql":
+        return 0
+    return queryset.update(searchDocument=search_document())
+
+
+def search_products(queryset, text: str, fallback_fields=("name",), candidates=None):
+    """
+    Products matching every word of `text` as a prefix (so "iph" finds
+    "iPhone"), annotated with `rank` for relevance ordering.
+
+    On Postgres this is a GIN-indexed `searchDocument @@ tsquery`, ranked
+    with ts_rank over the weighted document. Other backends (SQLite in local
+    dev) fall back to icontains on `fallback_fields` with a constant rank.
+
+    With `candidates`, only the `candidates` best-ranked matches are kept (for
+    callers that keep the top few); listings leave it unset so totals stay
+    exact.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        condition = Q()
+        for field in fallback_fields:
+            condition |= Q(**{f"{field}__icontains": text})
+        return queryset.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+    words = _words.findall(text.lower())
+    if not words:
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+    raw = " & ".join(f"{word}:*" for word in words)
+    query = SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+    if candidates:
+        # Order before the LIMIT so the subquery keeps the best matches,
+        # not whichever the scan happened to reach first.
+        matches = (
+            queryset.model._default_manager.filter(searchDocument=query)
+            .order_by(SearchRank(F("searchDocument"), query).desc(), "pk")
+            .values("pk")[:candidates]
+        )
+        queryset = queryset.filter(pk__in=matches)
+    else:
+        queryset = queryset.filter(searchDocument=query)
+    # float8 so the rank survives a round trip through a keyset cursor exactly.
+    return queryset.annotate(
+        rank=Cast(SearchRank(F("searchDocument"), query), FloatField())
+    )
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.db import connection, transaction
+from pgvector.django import CosineDistance
+
+from base.ai.vector_index import vector_index
+
+
+def semantic_matches(queryset, query_vec, max_distance, limit, exclude_ids=()):
+    """
+    Up to `limit` products closest to `query_vec` (cosine distance at most
+    `max_distance`), closest first, each annotated with `distance`.
+
+    On Postgres the ORDER BY distance LIMIT walks the HNSW index from
+    migration 0020 instead of scanning every embedding. hnsw.ef_search
+    (settings.HNSW_EF_SEARCH) is the size of the candidate list: higher
+    means better recall and slower queries. It is SET LOCAL so it only
+    applies to this query's transaction.
+
+    With SEMANTIC_SEARCH_ENGINE = "numpy" the neighbours come from the
+    worker's in-process index and only the matching rows are fetched.
+    """
+    if settings.SEMANTIC_SEARCH_ENGINE == "numpy":
+        return _indexed_matches(queryset, query_vec, max_distance, limit, exclude_ids)
+    queryset = (
+        queryset.exclude(embedding__isnull=True)
+        .exclude(_id__in=exclude_ids)
+        .annotate(distance=CosineDistance("embedding", query_vec))
+        .filter(distance__lte=max_distance)
+        .order_by("distance")[:limit]
+    )
+    if connection.vendor != "postgresql":
+        return list(queryset)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL hnsw.ef_search = {int(settings.HNSW_EF_SEARCH)}")
+        return list(queryset)
+
+
+def _indexed_matches(queryset, query_vec, max_distance, limit, exclude_ids):
+    hits = vector_index().search(query_vec, limit, max_distance, exclude=set(exclude_ids))
+    products = queryset.in_bulk([pk for pk, _ in hits])
+    matches = []
+    for pk, distance in hits:
+        # Missing: deleted (or filtered out) since the index last synced.
+        product = products.get(pk)
+        if product is not None:
+            product.distance = distance
+            matches.append(product)
+    return matches
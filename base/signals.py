@@ -2,8 +2,8 @@ from django.db.models.signals import pre_save, post_save, post_delete
 from django.contrib.auth.models import User
 
 from django.dispatch import receiver
-from base.models import Product, Category, Brand
-from base.utils.catalog_cache import invalidate_catalog_cache
+from base.models import Product, Category, Brand, ProductRanking, Review
+from base.utils.catalog_cache import invalidate_catalog_tags, listing_scope_tags
 
 def updateUser(sender, instance, **kwargs):
     user = instance
@@ -15,21 +15,124 @@ pre_save.connect(updateUser, sender=User)
 
 
 
-from base.ai.embedding import embed_text
+from base.services.embeddings import mark_embeddings_dirty
+from base.services.search import SEARCH_FIELDS, refresh_search_documents
+
+# Fields that feed Product.embedding_text().
+EMBEDDING_FIELDS = {"name", "description", "brand", "brand_id", "category", "category_id"}
+
 
 @receiver(post_save, sender=Product)
-def update_product_embedding(sender, instance, **kwargs):
-    text = instance.embedding_text()
-    vector = embed_text(text)
-    Product.objects.filter(pk=instance.pk).update(embedding=vector)
+def update_product_embedding(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """
+    Queue a re-embed only when the embedding text actually changed.
+
+    Stock/rating saves (update_fields without any text field) return
+    immediately; encoding runs in a batched Celery job, never in the request.
+    """
+    if raw:
+        return
+    if update_fields is not None and not EMBEDDING_FIELDS.intersection(update_fields):
+        return
+    if not created and instance.embeddingHash == instance.embedding_hash():
+        return
+    mark_embeddings_dirty(Product.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def update_category_embeddings(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        mark_embeddings_dirty(Product.objects.filter(category=instance))
+        refresh_search_documents(Product.objects.filter(category=instance))
+
+
+@receiver(post_save, sender=Brand)
+def update_brand_embeddings(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        mark_embeddings_dirty(Product.objects.filter(brand=instance))
+        refresh_search_documents(Product.objects.filter(brand=instance))
+
+
+@receiver(post_save, sender=Product)
+def update_search_document(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Rebuild the row's full-text document when its name/description/brand/category changed."""
+    if raw:
+        return
+    if update_fields is not None:
+        # Saves of deferred-loading instances list every loaded field here.
+        names = {sender._meta.get_field(name).name for name in update_fields}
+        changed = instance.changed_fields(names & SEARCH_FIELDS)
+    else:
+        changed = created or instance.changed_fields(SEARCH_FIELDS)
+    if changed:
+        refresh_search_documents(Product.objects.filter(pk=instance.pk))
+
+
+# Fields that decide which listings a product appears in, and its position.
+LISTING_FIELDS = {
+    "name", "price", "discountPercentage", "rating", "numReviews", "createdAt", "category", "brand",
+}
+
+
+@receiver(post_save, sender=Product)
+def create_product_ranking(sender, instance, created, raw=False, **kwargs):
+    """Unranked row so a new product trails rank-ordered listings until the next refresh."""
+    if created and not raw:
+        ProductRanking.objects.bulk_create([ProductRanking(product=instance)], ignore_conflicts=True)
 
 
 @receiver(post_save, sender=Product)
 @receiver(post_delete, sender=Product)
+def bust_product_cache(sender, instance, update_fields=None, **kwargs):
+    """
+    Evict the cached pages that show this product; listings it could enter
+    or move within only when a LISTING_FIELDS value changed. A stock or
+    description edit leaves every other page cached.
+    """
+    tags = {f"product:{instance.pk}"}
+    if kwargs.get("signal") is post_delete:
+        tags |= listing_scope_tags(instance)
+    else:
+        names = LISTING_FIELDS
+        if update_fields is not None:
+            names = {sender._meta.get_field(name).name for name in update_fields} & LISTING_FIELDS
+        changed = instance.changed_fields(names)
+        if changed:
+            tags |= listing_scope_tags(instance) | _previous_scope_tags(instance, changed)
+    invalidate_catalog_tags(*tags)
+
+
+def _previous_scope_tags(product, changed) -> set:
+    """Scope tags of the category/brand a product just left (their totals and facets change too)."""
+    loaded = getattr(product, "_loaded_values", {})
+    tags = set()
+    for field, model, prefix in (("category", Category, "category"), ("brand", Brand, "brand")):
+        old_id = loaded.get(f"{field}_id")
+        if field in changed and old_id:
+            slug = model.objects.filter(pk=old_id).values_list("slug", flat=True).first()
+            if slug:
+                tags.add(f"products:{prefix}:{slug}")
+    return tags
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bust_review_cache(sender, instance, **kwargs):
+    # Reviews only appear on the product detail (cached under product:<id>).
+    if instance.product_id:
+        invalidate_catalog_tags(f"product:{instance.product_id}")
+
+
 @receiver(post_save, sender=Category)
 @receiver(post_delete, sender=Category)
+def bust_category_cache(sender, instance, **kwargs):
+    invalidate_catalog_tags(
+        "ns:categories", f"category:{instance.pk}", f"products:category:{instance.slug}"
+    )
+
+
 @receiver(post_save, sender=Brand)
 @receiver(post_delete, sender=Brand)
-def bust_catalog_cache(sender, **kwargs):
-    invalidate_catalog_cache()
+def bust_brand_cache(sender, instance, **kwargs):
+    invalidate_catalog_tags("ns:brands", f"brand:{instance.pk}", f"products:brand:{instance.slug}")
 
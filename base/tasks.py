@@ -8,6 +8,8 @@ from base.services.emails import (
     send_low_stock_alert_email,
     send_order_confirmation_email,
 )
+from base.services.embeddings import refresh_dirty_embeddings
+from base.services.rankings import refresh_product_rankings
 
 logger = logging.getLogger(__name__)
 
@@ -33,3 +35,31 @@ def send_low_stock_alert_task(self, product_id: int):
     except Exception as exc:
         logger.exception("Low stock alert failed for product %s", product_id)
         raise self.retry(exc=exc)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def refresh_product_embeddings_task(self):
+    try:
+        encoded = refresh_dirty_embeddings()
+        logger.info("Refreshed %s product embeddings", encoded)
+    except Exception as exc:
+        logger.exception("Product embedding refresh failed")
+        raise self.retry(exc=exc)
+
+
+@shared_task
+def warm_catalog_cache_task():
+    from base.services.catalog_warm import warm_catalog_cache
+
+    counts = warm_catalog_cache()
+    logger.info("Catalog cache warm cycle: %s", counts)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def refresh_product_rankings_task(self):
+    try:
+        ranked = refresh_product_rankings()
+        logger.info("Refreshed rankings for %s products", ranked)
+    except Exception as exc:
+        logger.exception("Product ranking refresh failed")
+        raise self.retry(exc=exc)
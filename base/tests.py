@@ -1,10 +1,43 @@
+import gzip
+import json
+import threading
+import time
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase
 
-from base.factories import BrandFactory, CategoryFactory, ProductFactory
-from base.utils.catalog_cache import invalidate_catalog_cache
+from base.ai import embedding, query_cache
+from base.ai.batching import EmbeddingBatcher
+from base.ai.query_cache import clear_local_query_cache, embed_query
+from base.ai.vector_index import VectorIndex, clear_vector_index, mark_vector_index_stale, vector_index
+from base.factories import BrandFactory, CategoryFactory, ProductFactory, UserFactory
+from base.models import Order, OrderItem, Product, ProductRanking, Review
+from base.serializers import PRODUCT_CARD_VALUES, ProductListSerializer, product_cards
+from base.services.catalog_warm import replay_request, warm_catalog_cache
+from base.services.rankings import refresh_product_rankings
+from base.services.reviews import add_review, rebuild_review_aggregates
+from base.services.embeddings import refresh_dirty_embeddings
+from base.services.search import search_products
+from base.services.semantic import semantic_matches
+from base.services.stock import decrement_stock
+from base.utils import catalog_cache, media
+from base.utils.catalog_cache import (
+    _make_key,
+    _tag_key,
+    clear_local_cache,
+    flush_hit_counts,
+    hot_entries,
+    invalidate_catalog_cache,
+)
+from base.utils.media import absolute_media_url, absolute_media_urls
+from base.utils.pagination import encode_cursor
 
 
 class PublicApiSmokeTests(APITestCase):
@@ -35,6 +68,7 @@ class PublicApiSmokeTests(APITestCase):
 
     def test_products_list_uses_catalog_cache(self):
         cache.clear()
+        clear_local_cache()
         invalidate_catalog_cache()
         CategoryFactory()
         BrandFactory()
@@ -47,3 +81,981 @@ class PublicApiSmokeTests(APITestCase):
         self.assertEqual(second.status_code, status.HTTP_200_OK)
         self.assertEqual(first.get("X-Cache"), "MISS")
         self.assertEqual(second.get("X-Cache"), "HIT")
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        category = CategoryFactory()
+        brand = BrandFactory()
+        self.products = [
+            ProductFactory(category=category, brand=brand, numReviews=i % 3)
+            for i in range(11)
+        ]
+
+    def _walk(self, **params):
+        seen = []
+        cursor = ""
+        while True:
+            response = self.client.get(reverse("products"), {**params, "cursor": cursor})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(p["_id"] for p in response.data["products"])
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                return seen
+
+    def test_cursor_walk_matches_offset_ordering(self):
+        expected = [
+            p._id for p in sorted(self.products, key=lambda p: (p.createdAt, p._id), reverse=True)
+        ]
+        self.assertEqual(self._walk(), expected)
+
+    def test_cursor_walk_with_ties_has_no_duplicates(self):
+        ids = self._walk(filter_by="best_seller")
+        self.assertEqual(len(ids), len(self.products))
+        self.assertEqual(len(set(ids)), len(self.products))
+
+    def test_price_sort_walks_in_price_order(self):
+        ids = self._walk(sort="price_asc")
+        expected = [p._id for p in sorted(self.products, key=lambda p: (p.price, p._id))]
+        self.assertEqual(ids, expected)
+
+    def test_unknown_sort_is_rejected(self):
+        response = self.client.get(reverse("products"), {"sort": "random"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("products"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_wrong_typed_cursor_values_are_rejected(self):
+        cases = [
+            ({}, ["not a date", 1]),
+            ({}, ["2024-01-01T00:00:00+00:00", "abc"]),
+            ({"sort": "price_asc"}, [{"price": 1}, 5]),
+            ({"sort": "price_asc"}, ["NaN", 5]),
+            ({"keyword": "phone"}, ["high", 5]),
+        ]
+        for params, values in cases:
+            with self.subTest(params=params, values=values):
+                response = self.client.get(reverse("products"), {**params, "cursor": encode_cursor(values)})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.data["detail"], "Invalid cursor")
+
+
+class DiscountedPriceTests(APITestCase):
+    CASES = [
+        ("89.99", "10.00"),
+        ("0.05", "50.00"),  # exactly half a cent: rounds to even
+        ("0.07", "50.00"),
+        ("100.00", "0.00"),
+        ("100.00", "-5.00"),
+        ("0.00", "20.00"),
+        ("49.99", None),
+    ]
+
+    def setUp(self):
+        self.products = [
+            ProductFactory(
+                price=Decimal(price),
+                discountPercentage=Decimal(pct) if pct is not None else None,
+            )
+            for price, pct in self.CASES
+        ]
+
+    def test_generated_column_matches_python_property(self):
+        for product in self.products:
+            stored = Product.objects.values_list("discountedPrice", flat=True).get(pk=product.pk)
+            self.assertEqual(stored, product.discount_price, (product.price, product.discountPercentage))
+
+    def test_discount_listing_filters_in_sql(self):
+        expected = {
+            p._id for p in self.products
+            if p.discountPercentage and p.price and p.discount_price < p.price
+        }
+        response = self.client.get(reverse("products"), {"filter_by": "discount"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({p["_id"] for p in response.data["products"]}, expected)
+        self.assertEqual(response.data["total"], len(expected))
+
+
+class ProductListRepresentationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.products = ProductFactory.create_batch(5)
+
+    def test_listing_omits_reviews_and_runs_constant_queries(self):
+        with self.assertNumQueries(2):  # COUNT(*) + one joined page query
+            response = self.client.get(reverse("products"), {"page": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["products"]), 5)
+        self.assertNotIn("reviews", response.data["products"][0])
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse("products"), {"fields": "_id,name,price"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["products"][0]), {"_id", "name", "price"})
+
+    def test_detail_keeps_reviews(self):
+        response = self.client.get(reverse("product", args=[self.products[0]._id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["reviews"], [])
+
+
+class ProductCardTests(APITestCase):
+    def setUp(self):
+        ProductFactory(discountPercentage=Decimal("12.5"), price=Decimal("99.99"))
+        ProductFactory(category=None, brand=None, rating=None, ratingTotal=0, price=None, image="products/x.jpg")
+        ProductFactory(description=None, user=None)
+        self.products = list(Product.objects.select_related("category", "brand").order_by("_id"))
+        self.request = APIRequestFactory().get("/api/products/")
+
+    def _expected(self, **context):
+        data = ProductListSerializer(self.products, many=True, context={"request": self.request, **context}).data
+        return [dict(card) for card in data]
+
+    def test_matches_list_serializer_field_for_field(self):
+        expected = self._expected()
+        cards = product_cards(self.products, self.request)
+        self.assertEqual(cards, expected)
+        self.assertEqual([list(c) for c in cards], [list(c) for c in expected])
+
+    def test_values_rows_match(self):
+        rows = Product.objects.order_by("_id").values(*PRODUCT_CARD_VALUES)
+        self.assertEqual(product_cards(rows, self.request), self._expected())
+
+    def test_sparse_fields_match(self):
+        fields = ["_id", "price", "brand"]
+        self.assertEqual(product_cards(self.products, None, fields), self._expected(fields=fields, request=None))
+
+
+class MediaUrlTests(APITestCase):
+    def setUp(self):
+        self.request = APIRequestFactory().get("/api/products/")
+        self.image = ProductFactory(image="products/phone.jpg").image
+
+    def test_urls_resolve_as_before(self):
+        self.assertEqual(absolute_media_url(self.image, self.request), "http://testserver/images/products/phone.jpg")
+        self.assertEqual(
+            absolute_media_url(None, self.request), "http://testserver/images/placeholder.png"
+        )
+        with self.settings(BACKEND_BASE_URL="https://api.example.com/"):
+            self.assertEqual(absolute_media_url(self.image), "https://api.example.com/images/products/phone.jpg")
+
+    def test_storage_url_is_memoized_per_name(self):
+        with patch.object(FileSystemStorage, "url", return_value="/images/x.jpg") as url:
+            media._storage_path.cache_clear()
+            urls = absolute_media_urls([self.image, self.image, None], self.request)
+        self.assertEqual(url.call_count, 1)
+        self.assertEqual(urls[0], urls[1])
+        self.assertEqual(urls[2], "http://testserver/images/placeholder.png")
+        media._storage_path.cache_clear()
+
+    def test_host_is_part_of_the_key(self):
+        other = APIRequestFactory().get("/api/products/", HTTP_HOST="shop.example.com")
+        with self.settings(ALLOWED_HOSTS=["testserver", "shop.example.com"]):
+            self.assertEqual(
+                absolute_media_url(self.image, other), "http://shop.example.com/images/products/phone.jpg"
+            )
+        self.assertTrue(absolute_media_url(self.image, self.request).startswith("http://testserver/"))
+
+
+class DeferredEmbeddingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.product = ProductFactory(embedding=[0.5] * 384)
+
+    def test_default_queries_skip_the_vector(self):
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.get_deferred_fields(), {"embedding", "searchDocument"})
+        self.assertNotIn('"embedding"', str(Product.objects.all().query))
+
+        loaded = Product.objects.with_embedding().get(pk=self.product.pk)
+        self.assertEqual(loaded.get_deferred_fields(), {"searchDocument"})
+        self.assertEqual(list(loaded.embedding), [0.5] * 384)
+
+    def test_related_access_defers_too(self):
+        review = Review.objects.create(product=self.product, rating=5)
+        review = Review.objects.get(pk=review.pk)
+        self.assertIn("embedding", review.product.get_deferred_fields())
+
+    def test_loading_the_vector_keeps_unsaved_edits(self):
+        product = Product.objects.get(pk=self.product.pk)
+        product.name = "Edited"
+        with self.assertNumQueries(1):
+            self.assertEqual(list(product.embedding), [0.5] * 384)
+        self.assertEqual(product.name, "Edited")
+
+    def test_saving_a_deferred_instance_only_busts_what_changed(self):
+        # A products:all page that does not show the edited product.
+        ProductFactory(name="Zebra gadget")
+        params = {"keyword": "zebra"}
+        url = reverse("products")
+        self.client.get(url, params)
+        product = Product.objects.get(pk=self.product.pk)
+        product.countInStock += 1
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertEqual(self.client.get(url, params)["X-Cache"], "HIT")
+        self.assertEqual(list(Product.objects.with_embedding().get(pk=product.pk).embedding), [0.5] * 384)
+
+
+class ReviewAggregateTests(APITestCase):
+    def setUp(self):
+        self.product = ProductFactory(rating=None, numReviews=0, ratingTotal=0)
+        self.users = UserFactory.create_batch(3)
+
+    def _review(self, user, rating):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            reverse("create-review", args=[self.product._id]),
+            {"rating": rating, "comment": "ok"},
+            format="json",
+        )
+
+    def test_reviews_update_aggregates_incrementally(self):
+        for user, rating in zip(self.users, [5, 4, 2]):
+            self.assertEqual(self._review(user, rating).status_code, status.HTTP_200_OK)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.numReviews, 3)
+        self.assertEqual(self.product.ratingTotal, 11)
+        self.assertEqual(self.product.rating, Decimal("3.67"))
+
+    def test_rebuild_recomputes_from_review_rows(self):
+        for user, rating in zip(self.users, [5, 4, 2]):
+            self._review(user, rating)
+        Product.objects.filter(pk=self.product.pk).update(numReviews=99, ratingTotal=1, rating=1)
+
+        rebuild_review_aggregates()
+
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.numReviews, self.product.ratingTotal), (3, 11))
+        self.assertEqual(self.product.rating, Decimal("3.67"))
+
+
+class CatalogCacheStampedeTests(APITestCase):
+    PAYLOAD = {
+        "path": "/api/products/",
+        "query": {},
+        "args": [],
+        "kwargs": {},
+        "format": "application/json",
+    }
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        ProductFactory()
+
+    def test_stale_payload_served_while_another_worker_refreshes(self):
+        self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "MISS")
+        invalidate_catalog_cache()
+
+        lock_key = f"{_make_key('products', self.PAYLOAD)}:lock"
+        cache.add(lock_key, 1, 10)
+        stale = self.client.get(reverse("products"))
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+        self.assertEqual(stale.get("X-Cache"), "STALE")
+
+        cache.delete(lock_key)
+        self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "MISS")
+        self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "HIT")
+
+    def test_waits_for_lock_holder_when_nothing_stale(self):
+        lock_key = f"{_make_key('products', self.PAYLOAD)}:lock"
+        cache.add(lock_key, 1, 10)
+        with patch("base.utils.catalog_cache.LOCK_WAIT", 0.1):
+            response = self.client.get(reverse("products"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.get("X-Cache"), "MISS")
+
+
+class RenderedCatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        ProductFactory.create_batch(8)
+
+    def test_hits_replay_rendered_bytes(self):
+        miss = self.client.get(reverse("products"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(miss.get("X-Cache"), "MISS")
+        expected = json.loads(miss.content)
+
+        hit = self.client.get(reverse("products"), HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(hit.get("X-Cache"), "HIT")
+        self.assertEqual(hit["Content-Encoding"], "gzip")
+        self.assertEqual(hit["Content-Type"], "application/json")
+        self.assertEqual(hit["Cache-Control"], miss["Cache-Control"])
+        self.assertIn("Accept-Encoding", hit["Vary"])
+        self.assertEqual(json.loads(gzip.decompress(hit.content)), expected)
+
+    def test_clients_without_gzip_get_plain_json(self):
+        self.client.get(reverse("products"))
+        hit = self.client.get(reverse("products"))
+        self.assertEqual(hit.get("X-Cache"), "HIT")
+        self.assertFalse(hit.has_header("Content-Encoding"))
+        self.assertIn("products", hit.json())
+
+
+class TaggedCatalogInvalidationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.phones = CategoryFactory(slug="phones")
+        self.laptops = CategoryFactory(slug="laptops")
+        self.acme = BrandFactory(slug="acme")
+        self.phone = ProductFactory(category=self.phones, brand=self.acme, countInStock=10)
+        self.laptop = ProductFactory(category=self.laptops, countInStock=10)
+        self.urls = {
+            "phones": reverse("products") + "?category_slug=phones",
+            "laptops": reverse("products") + "?category_slug=laptops",
+            "all": reverse("products"),
+            "brands": reverse("brand"),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def _states(self):
+        return {name: self.client.get(url).get("X-Cache") for name, url in self.urls.items()}
+
+    def test_stock_change_only_evicts_pages_showing_the_product(self):
+        with patch("base.services.stock.enqueue_background"):
+            decrement_stock(self.phone, 1)
+        self.assertEqual(
+            self._states(), {"phones": "MISS", "laptops": "HIT", "all": "MISS", "brands": "HIT"}
+        )
+
+    def test_description_edit_keeps_other_listings(self):
+        self.laptop.description = "Updated copy"
+        self.laptop.save()
+        self.assertEqual(self._states()["phones"], "HIT")
+
+    def test_new_product_evicts_its_category_listing(self):
+        ProductFactory(category=self.laptops)
+        states = self._states()
+        self.assertEqual((states["laptops"], states["phones"]), ("MISS", "HIT"))
+
+    def test_moving_category_evicts_old_and_new_listings(self):
+        self.phone.category = self.laptops
+        self.phone.save()
+        states = self._states()
+        self.assertEqual((states["phones"], states["laptops"]), ("MISS", "MISS"))
+        self.assertEqual(self.client.get(self.urls["phones"]).json()["total"], 0)
+
+    def test_move_evicts_old_scope_pages_not_showing_the_product(self):
+        facets = {
+            "phones": reverse("product-facets") + "?category_slug=phones",
+            "acme": reverse("product-facets") + "?brand_slug=acme",
+        }
+        for url in facets.values():
+            self.assertEqual(self.client.get(url).json()["total"], 1)
+
+        self.phone.category = self.laptops
+        self.phone.brand = BrandFactory(slug="zeta")
+        self.phone.save()
+        for url in facets.values():
+            response = self.client.get(url)
+            self.assertEqual(response.get("X-Cache"), "MISS")
+            self.assertEqual(response.json()["total"], 0)
+
+    def test_brand_rename_evicts_brand_list_and_its_products(self):
+        self.acme.name = "Acme Pro"
+        self.acme.save()
+        self.assertEqual(
+            self._states(), {"phones": "MISS", "laptops": "HIT", "all": "MISS", "brands": "MISS"}
+        )
+
+    def test_review_evicts_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            add_review(self.laptop, UserFactory(), 5, "great")
+        states = self._states()
+        self.assertEqual((states["laptops"], states["phones"]), ("MISS", "HIT"))
+
+    def test_global_invalidation_still_clears_everything(self):
+        invalidate_catalog_cache()
+        self.assertEqual(set(self._states().values()), {"MISS"})
+
+
+class LocalCatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.product = ProductFactory()
+        self.client.get(reverse("products"))
+
+    def test_hot_hits_skip_the_shared_cache(self):
+        with patch.object(catalog_cache, "cache") as shared:
+            response = self.client.get(reverse("products"))
+        self.assertEqual(response.get("X-Cache"), "HIT")
+        self.assertEqual(shared.method_calls, [])
+
+    def test_remote_bumps_apply_after_tag_check_interval(self):
+        # Another process bumping the tag: only the shared cache changes.
+        cache.set(_tag_key(f"product:{self.product.pk}"), 1, None)
+        self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "HIT")
+        with patch.object(catalog_cache, "TAG_CHECK_INTERVAL", 0):
+            self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "MISS")
+
+    def test_l1_is_bounded(self):
+        with patch.object(catalog_cache._local, "max_entries", 2):
+            for page in range(1, 5):
+                self.client.get(reverse("products") + f"?page={page}")
+            self.assertEqual(len(catalog_cache._local.entries), 2)
+
+
+class CatalogWarmTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.product = ProductFactory()
+
+    def test_hits_are_ranked_in_the_hot_registry(self):
+        for _ in range(3):
+            self.client.get(reverse("products"), {"page": 1})
+        self.client.get(reverse("category"))
+        flush_hit_counts()
+
+        hottest = hot_entries(1)[0]
+        self.assertEqual((hottest["path"], hottest["query"]), (reverse("products"), "page=1"))
+        self.assertEqual(hottest["hits"], 3)
+
+    def test_warm_cycle_rerenders_outdated_hot_pages(self):
+        self.client.get(reverse("products"))
+        self.client.get(reverse("brand"))
+        self.product.price = Decimal("1.00")
+        self.product.save()
+
+        self.assertEqual(warm_catalog_cache(), {"warmed": 1, "fresh": 1, "skipped": 0})
+        self.assertEqual(self.client.get(reverse("products")).get("X-Cache"), "HIT")
+        # Replayed requests are not counted as visitor hits.
+        flush_hit_counts()
+        self.assertAlmostEqual(hot_entries(1)[0]["hits"], 2, places=2)
+
+    def test_replay_request_matches_the_recorded_visit(self):
+        entry = {
+            "path": "/api/products/café/",
+            "query": "page=2&keyword=caf%C3%A9",
+            "accept": "application/json; version=1",
+            "host": "shop.example.com:8443",
+            "secure": True,
+        }
+        with self.settings(ALLOWED_HOSTS=["shop.example.com", "example.com"]):
+            request = replay_request(entry)
+            self.assertEqual(request.method, "GET")
+            self.assertEqual(request.path, "/api/products/café/")
+            self.assertEqual(request.GET.dict(), {"page": "2", "keyword": "café"})
+            self.assertEqual(request.build_absolute_uri("/"), "https://shop.example.com:8443/")
+            self.assertEqual(request.META["HTTP_ACCEPT"], "application/json; version=1")
+            self.assertTrue(request.META[catalog_cache.WARM_META_KEY])
+
+            plain = replay_request({**entry, "host": "example.com", "secure": False, "accept": None})
+            self.assertEqual(plain.build_absolute_uri("/"), "http://example.com/")
+            self.assertEqual(plain.META["SERVER_PORT"], "80")
+            self.assertEqual(plain.META["HTTP_ACCEPT"], "application/json")
+
+    @patch("base.services.catalog_warm.enqueue_background")
+    def test_burst_of_saves_schedules_one_cycle(self, mock_enqueue):
+        with self.captureOnCommitCallbacks(execute=True):
+            for price in ("1.00", "2.00", "3.00"):
+                self.product.price = Decimal(price)
+                self.product.save()
+        mock_enqueue.assert_called_once()
+
+
+class ProductFacetTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        phones, laptops = CategoryFactory(slug="phones"), CategoryFactory(slug="laptops")
+        acme, zeta = BrandFactory(slug="acme"), BrandFactory(slug="zeta")
+        # Fixed descriptions: keyword search also matches description text.
+        ProductFactory(name="Phone A", description="Budget", category=phones, brand=acme, price=Decimal("40.00"))
+        ProductFactory(name="Phone B", description="Flagship", category=phones, brand=zeta, price=Decimal("599.99"))
+        ProductFactory(name="Laptop", description="Ultrabook", category=laptops, brand=acme, price=Decimal("1299.99"))
+        ProductFactory(name="Cable", description="USB-C", category=None, brand=None, price=Decimal("50.00"))
+
+    def _counts(self, rows):
+        return {row["slug"]: row["count"] for row in rows}
+
+    def test_counts_all_facets_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-facets"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data["total"], 4)
+        self.assertEqual(self._counts(data["categories"]), {"phones": 2, "laptops": 1})
+        self.assertEqual(self._counts(data["brands"]), {"acme": 2, "zeta": 1})
+        self.assertEqual(
+            [(b["min"], b["max"], b["count"]) for b in data["price"]],
+            [(0, 50, 1), (50, 100, 1), (100, 250, 0), (250, 500, 0), (500, 1000, 1), (1000, None, 1)],
+        )
+
+    def test_applies_listing_filters(self):
+        data = self.client.get(
+            reverse("product-facets"), {"keyword": "phone", "brand_slug": "acme"}
+        ).json()
+        self.assertEqual(data["total"], 1)
+        self.assertEqual(self._counts(data["categories"]), {"phones": 1})
+
+    def test_is_cached_and_evicted_by_product_changes(self):
+        self.client.get(reverse("product-facets"))
+        self.assertEqual(self.client.get(reverse("product-facets")).get("X-Cache"), "HIT")
+        ProductFactory(price=Decimal("10.00"))
+        response = self.client.get(reverse("product-facets"))
+        self.assertEqual(response.get("X-Cache"), "MISS")
+        self.assertEqual(response.json()["total"], 5)
+
+    def test_invalid_price_filter(self):
+        response = self.client.get(reverse("product-facets"), {"minPrice": "cheap"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["detail"], "Invalid minPrice value")
+
+
+class KeywordSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.apple = BrandFactory(name="Apple", slug="apple")
+        self.in_name = ProductFactory(name="Wireless Phone Charger", description="Fast pad")
+        self.in_description = ProductFactory(name="Desk Lamp", description="Charges your phone")
+        self.by_brand = ProductFactory(name="MacBook Air", brand=self.apple, description="Laptop")
+
+    def _names(self, **params):
+        return [p["name"] for p in self.client.get(reverse("products"), params).json()["products"]]
+
+    def test_keyword_listing_matches(self):
+        self.assertIn("Wireless Phone Charger", self._names(keyword="phone"))
+        self.assertNotIn("MacBook Air", self._names(keyword="phone"))
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search is Postgres-only")
+    def test_ranks_name_matches_above_description_matches(self):
+        self.assertEqual(self._names(keyword="phones"), ["Wireless Phone Charger", "Desk Lamp"])
+        self.assertEqual(self._names(keyword="wirel"), ["Wireless Phone Charger"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search is Postgres-only")
+    def test_documents_follow_product_and_brand_edits(self):
+        self.assertEqual(self._names(keyword="apple"), ["MacBook Air"])
+        self.apple.name = "Pineapple"
+        self.apple.save()
+        self.in_name.name = "Wireless Pineapple Charger"
+        self.in_name.save()
+        self.assertEqual(sorted(self._names(keyword="pineapple")), ["MacBook Air", "Wireless Pineapple Charger"])
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search is Postgres-only")
+    def test_relevance_order_supports_cursors(self):
+        ProductFactory.create_batch(10, name="Phone Case")
+        first = self.client.get(reverse("products"), {"keyword": "phone", "cursor": ""}).json()
+        second = self.client.get(
+            reverse("products"), {"keyword": "phone", "cursor": first["next_cursor"]}
+        ).json()
+        ids = [p["_id"] for p in first["products"] + second["products"]]
+        self.assertEqual(len(ids), 12)
+        self.assertEqual(len(set(ids)), 12)
+
+    @skipUnless(connection.vendor == "postgresql", "full-text search is Postgres-only")
+    def test_candidates_are_the_best_matches(self):
+        ProductFactory.create_batch(6, name="Widget", description="Fits any phone")
+        best = ProductFactory(name="Phone Phone Phone", description="")
+        matches = search_products(Product.objects.all(), "phone", candidates=3).order_by("-rank")
+        names = [p.name for p in matches]
+        self.assertEqual(len(names), 3)
+        self.assertEqual(names[0], best.name)
+        self.assertIn("Wireless Phone Charger", names)
+        self.assertNotIn("Widget", names)
+
+
+class SemanticSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        clear_vector_index()
+        self.near, self.far, self.excluded = (
+            ProductFactory(embedding=[1.0, 0.1] + [0.0] * 382),
+            ProductFactory(embedding=[0.0, 1.0] + [0.0] * 382),
+            ProductFactory(embedding=[1.0, 0.0] + [0.0] * 382),
+        )
+        self.pending = ProductFactory(embedding=None)
+        self.query = [1.0] + [0.0] * 383
+
+    def _search(self, max_distance=0.5):
+        return semantic_matches(
+            Product.objects.all(), self.query, max_distance, 5, exclude_ids=[self.excluded._id]
+        )
+
+    def test_closest_first_within_max_distance(self):
+        for engine in ("numpy", "pgvector") if connection.vendor == "postgresql" else ("numpy",):
+            with self.subTest(engine=engine), self.settings(SEMANTIC_SEARCH_ENGINE=engine):
+                matches = self._search()
+                self.assertEqual([p._id for p in matches], [self.near._id])
+                self.assertLess(matches[0].distance, 0.01)
+                self.assertEqual([p._id for p in self._search(2.0)], [self.near._id, self.far._id])
+
+    @skipUnless(connection.vendor == "postgresql", "pgvector is Postgres-only")
+    def test_ef_search_is_applied(self):
+        with self.settings(HNSW_EF_SEARCH=77, SEMANTIC_SEARCH_ENGINE="pgvector"):
+            self._search()
+            # The test transaction is still open, so the SET LOCAL is visible.
+            with connection.cursor() as cursor:
+                cursor.execute("SHOW hnsw.ef_search")
+                self.assertEqual(cursor.fetchone()[0], "77")
+
+    @patch("base.services.embeddings.embed_texts", side_effect=lambda texts: [[0.0, 0.0, 1.0] + [0.0] * 381 for _ in texts])
+    def test_numpy_index_follows_embedding_writes(self, _embed):
+        with self.settings(SEMANTIC_SEARCH_ENGINE="numpy"):
+            self.assertEqual(len(self._search(2.0)), 2)
+            with self.assertNumQueries(1):  # rows only; the index is warm
+                self._search(2.0)
+
+            # Every factory product is queued for encoding; re-encode them all.
+            with self.captureOnCommitCallbacks(execute=True):
+                refresh_dirty_embeddings()
+            self.near.delete()
+            vector_index().refresh(force=True)
+
+            distances = {p._id: p.distance for p in self._search(2.0)}
+            self.assertEqual(set(distances), {self.far._id, self.pending._id})
+            self.assertAlmostEqual(distances[self.far._id], 1.0, places=5)
+
+
+class EmbeddingModelTests(APITestCase):
+    def setUp(self):
+        loaded = embedding._model
+        self.addCleanup(setattr, embedding, "_model", loaded)
+        embedding._model = None
+
+    def test_loaded_once_on_first_concurrent_use(self):
+        def slow_load(name):
+            time.sleep(0.05)
+            return object()
+
+        with patch("sentence_transformers.SentenceTransformer", side_effect=slow_load) as load:
+            threads = [threading.Thread(target=embedding.get_model) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertIs(embedding.get_model(), embedding._model)
+        load.assert_called_once_with(embedding.MODEL_NAME)
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            embedding.load_model("onnx")
+
+
+class EmbeddingBatcherTests(APITestCase):
+    def _submit_together(self, batcher, texts):
+        results, barrier = {}, threading.Barrier(len(texts))
+
+        def call(i, text):
+            barrier.wait()
+            try:
+                results[i] = batcher.submit(text)
+            except Exception as exc:
+                results[i] = exc
+
+        threads = [threading.Thread(target=call, args=item) for item in enumerate(texts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return [results[i] for i in range(len(texts))]
+
+    def test_concurrent_callers_share_encodes(self):
+        calls = []
+
+        def encode(texts):
+            calls.append(list(texts))
+            return [f"vec:{text}" for text in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=4, max_wait=0.2)
+        texts = ["tv", "phone", "tv", "laptop", "mouse", "tv"]
+        self.assertEqual(self._submit_together(batcher, texts), [f"vec:{text}" for text in texts])
+        self.assertLess(len(calls), len(texts))
+        self.assertTrue(all(len(batch) <= 4 and len(set(batch)) == len(batch) for batch in calls))
+
+    def test_encode_errors_reach_every_caller(self):
+        batcher = EmbeddingBatcher(lambda texts: 1 / 0, max_batch_size=8, max_wait=0.05)
+        results = self._submit_together(batcher, ["a", "b", "c"])
+        self.assertTrue(all(isinstance(result, ZeroDivisionError) for result in results))
+        # The dispatcher thread survives a failed batch.
+        batcher.encode = lambda texts: [len(text) for text in texts]
+        self.assertEqual(batcher.submit("abc"), 3)
+
+    def test_short_results_fail_the_batch_instead_of_hanging(self):
+        batcher = EmbeddingBatcher(lambda texts: [0] * (len(texts) - 1), max_batch_size=8, max_wait=0.05)
+        results = self._submit_together(batcher, ["a", "b"])
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    def test_dead_dispatcher_is_restarted(self):
+        def encode(texts):
+            if "exit" in texts:
+                raise SystemExit  # ends the dispatcher thread
+            return [len(text) for text in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=1, max_wait=0)
+        with self.assertRaises(RuntimeError):
+            batcher.submit("exit")
+        batcher._thread.join(1)
+        self.assertEqual(batcher.submit("abcd"), 4)
+
+    def test_stuck_dispatcher_falls_back_to_a_direct_encode(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def encode(texts):
+            if threading.current_thread().name == "embedding-batcher":
+                release.wait()
+            return [f"vec:{text}" for text in texts]
+
+        batcher = EmbeddingBatcher(encode, max_batch_size=1, max_wait=0, timeout=0.05)
+        self.assertEqual(batcher.submit("tv"), "vec:tv")
+
+
+class _InMemoryIndex(VectorIndex):
+    """VectorIndex over {pk: (embeddingHash, vector)}, loading `delay` seconds per row."""
+
+    def __init__(self, vectors, delay=0.0):
+        super().__init__(dimensions=2)
+        self.vectors, self.delay = vectors, delay
+
+    def _current_hashes(self):
+        return {pk: digest for pk, (digest, _) in self.vectors.items()}
+
+    def _load(self, pks):
+        for pk in pks:
+            time.sleep(self.delay)
+            yield (pk, *self.vectors[pk])
+
+
+class VectorIndexTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.query = [1.0, 0.0]
+
+    def _in_background(self, target):
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.addCleanup(thread.join)
+        time.sleep(0.02)
+        return thread
+
+    def test_searches_wait_for_the_first_load(self):
+        index = _InMemoryIndex({pk: ("a", [1.0, pk / 100]) for pk in range(1, 21)}, delay=0.005)
+        self._in_background(index.refresh)
+        self.assertEqual(len(index.search(self.query, 20)), 20)
+
+    def test_resync_is_published_whole(self):
+        index = _InMemoryIndex({pk: ("a", [1.0, pk / 100]) for pk in range(1, 21)}, delay=0.005)
+        index.refresh()
+        index.vectors = {pk: ("b", [0.0, 1.0]) for pk in range(1, 21)}
+        mark_vector_index_stale()
+        index._checked = None
+        loader = self._in_background(index.refresh)
+
+        # Mid-resync: the previous rows, all of them, none of the new ones.
+        hits = index.search(self.query, 20)
+        self.assertTrue(loader.is_alive())
+        self.assertEqual(len(hits), 20)
+        self.assertTrue(all(distance < 0.5 for _, distance in hits))
+
+        loader.join()
+        self.assertTrue(all(abs(distance - 1.0) < 1e-6 for _, distance in index.search(self.query, 20)))
+
+    def test_free_rows_do_not_shorten_results(self):
+        index = _InMemoryIndex({
+            1: ("a", [1.0, 0.0]), 2: ("a", [1.0, 0.1]),
+            3: ("a", [-1.0, 0.1]), 4: ("a", [-1.0, 0.2]), 5: ("a", [-1.0, 0.3]),
+        })
+        index.refresh()
+        del index.vectors[1], index.vectors[2]
+        index.refresh(force=True)
+        self.assertEqual(len(index), 3)
+        self.assertEqual([pk for pk, _ in index.search(self.query, 2)], [5, 4])
+
+
+class QueryEmbeddingCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_query_cache()
+        self.addCleanup(clear_local_query_cache)
+
+    @patch("base.ai.embedding.embed_text", return_value=[0.6, 0.8] + [0.0] * 382)
+    def test_encoded_once_across_workers(self, embed):
+        vector = embed_query("  Wireless   HEADPHONES ")
+        embed.assert_called_once_with("wireless headphones")
+        self.assertEqual(embed_query("wireless headphones"), vector)
+
+        clear_local_query_cache()  # another worker: only the shared cache is warm
+        self.assertEqual(embed_query("Wireless headphones"), vector)
+        self.assertEqual(embed.call_count, 1)
+        self.assertAlmostEqual(vector[0], 0.6, places=3)
+        self.assertAlmostEqual(vector[1], 0.8, places=3)
+
+        packed = cache.get(query_cache._key("wireless headphones"))
+        self.assertEqual(len(packed), 384 * 2)
+
+    @patch("base.ai.embedding.embed_text", return_value=[1.0] + [0.0] * 383)
+    def test_key_includes_model_and_backend(self, embed):
+        embed_query("laptop")
+        clear_local_query_cache()
+        with patch("base.ai.embedding.MODEL_NAME", "another-model"):
+            embed_query("laptop")
+        clear_local_query_cache()
+        with self.settings(EMBEDDING_BACKEND="torch-int8"):
+            embed_query("laptop")
+        self.assertEqual(embed.call_count, 3)
+
+
+class ProductBatchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.products = ProductFactory.create_batch(3, countInStock=10)
+        self.ids = [p._id for p in self.products]
+
+    def _get(self, ids, **params):
+        return self.client.get(reverse("products-batch"), {"ids": ",".join(map(str, ids)), **params})
+
+    def test_returns_cards_in_request_order_and_reports_missing(self):
+        ids = [self.ids[2], 999999, self.ids[0]]
+        with self.assertNumQueries(1):
+            data = self._get(ids).json()
+        self.assertEqual([p["_id"] for p in data["products"]], [self.ids[2], self.ids[0]])
+        self.assertEqual(data["missing"], [999999])
+        self.assertNotIn("reviews", data["products"][0])
+
+    def test_warm_cards_need_no_queries_and_follow_stock_changes(self):
+        self._get(self.ids)
+        with self.assertNumQueries(0):
+            self._get(self.ids)
+
+        with patch("base.services.stock.enqueue_background"):
+            decrement_stock(self.products[1], 4)
+        with self.assertNumQueries(1):
+            data = self._get(self.ids).json()
+        self.assertEqual(data["products"][1]["countInStock"], 6)
+
+    def test_sparse_fields(self):
+        data = self._get(self.ids[:1], fields="_id,price").json()
+        self.assertEqual(set(data["products"][0]), {"_id", "price"})
+
+    def test_rejects_bad_or_oversized_requests(self):
+        self.assertEqual(self._get(["1", "x"]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._get(range(1, 102)).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductDetailCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.product, self.other = ProductFactory.create_batch(2)
+
+    def _detail(self, product):
+        return self.client.get(reverse("product", args=[product._id]))
+
+    def test_detail_is_cached_per_product(self):
+        self._detail(self.product)
+        with self.assertNumQueries(0):
+            response = self._detail(self.product)
+        self.assertEqual(response.data["_id"], self.product._id)
+        self.assertIn("reviews", response.data)
+
+    def test_review_only_invalidates_its_product(self):
+        self._detail(self.product)
+        self._detail(self.other)
+        self.client.force_authenticate(UserFactory())
+        self.client.post(
+            reverse("create-review", args=[self.product._id]), {"rating": 4, "comment": "ok"}, format="json"
+        )
+
+        self.assertEqual(len(self._detail(self.product).data["reviews"]), 1)
+        with self.assertNumQueries(0):
+            self._detail(self.other)
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse("product", args=[999999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("product", args=["abc"])).status_code, 404)
+
+
+
+class ProductRankingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.user = UserFactory()
+        self.popular, self.steady, self.unsold = ProductFactory.create_batch(
+            3, rating=Decimal("4.5"), numReviews=10, ratingTotal=45
+        )
+
+    def _sell(self, product, qty, paid=True):
+        order = Order.objects.create(user=self.user, totalPrice=product.price * qty, isPaid=paid)
+        OrderItem.objects.create(order=order, product=product, name=product.name, qty=qty, price=product.price)
+
+    def _listing(self, filter_by):
+        response = self.client.get(reverse("products"), {"filter_by": filter_by})
+        return [p["_id"] for p in response.json()["products"]]
+
+    def test_best_seller_follows_paid_units_sold(self):
+        self._sell(self.steady, 3)
+        self._sell(self.popular, 5)
+        self._sell(self.unsold, 50, paid=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(refresh_product_rankings(), 3)
+
+        self.assertEqual(ProductRanking.objects.get(product=self.popular).unitsSold, 5)
+        self.assertEqual(
+            self._listing("best_seller"), [self.popular._id, self.steady._id, self.unsold._id]
+        )
+
+    def test_refresh_evicts_rank_ordered_pages(self):
+        refresh_product_rankings()
+        self._listing("best_seller")
+        self._sell(self.unsold, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_product_rankings()
+
+        self.assertEqual(self._listing("best_seller")[0], self.unsold._id)
+
+    def test_featured_weighs_review_count(self):
+        lucky = ProductFactory(rating=Decimal("5.0"), numReviews=1, ratingTotal=5)
+        refresh_product_rankings()
+
+        top = [p["_id"] for p in self.client.get(reverse("top-products")).json()]
+        self.assertEqual(top[-1], lucky._id)
+        self.assertEqual(self._listing("featured")[-1], lucky._id)
+
+    def test_new_products_trail_until_next_refresh(self):
+        refresh_product_rankings()
+        newcomer = ProductFactory(numReviews=100, rating=Decimal("4.0"))
+        self.assertEqual(self._listing("best_seller")[-1], newcomer._id)
+        self.assertEqual(self._listing("featured")[-1], newcomer._id)
+        self.assertEqual(self.client.get(reverse("products"), {"filter_by": "best_seller"}).json()["total"], 4)
+        self.assertIn(newcomer._id, [p["_id"] for p in self.client.get(reverse("top-products")).json()])
+
+        # Keyset pages cross from ranked into unranked products.
+        first = self.client.get(reverse("products"), {"filter_by": "best_seller", "cursor": ""}).json()
+        self.assertIsNone(first["next_cursor"])
+        self.assertEqual(first["products"][-1]["_id"], newcomer._id)
+        with patch("base.views.product_views.PAGE_SIZE", 2):
+            cache.clear()
+            clear_local_cache()
+            first = self.client.get(reverse("products"), {"filter_by": "best_seller", "cursor": ""}).json()
+            second = self.client.get(
+                reverse("products"), {"filter_by": "best_seller", "cursor": first["next_cursor"]}
+            ).json()
+        walked = [p["_id"] for p in first["products"] + second["products"]]
+        self.assertEqual(walked, self._listing("best_seller"))
+
+        cache.clear()
+        clear_local_cache()
+        refresh_product_rankings()
+        # No sales anywhere: review count breaks the tie.
+        self.assertEqual(self._listing("best_seller")[0], newcomer._id)
+
+    def test_live_order_before_first_refresh(self):
+        busy = ProductFactory(numReviews=99)
+        self.assertEqual(self._listing("best_seller")[0], busy._id)
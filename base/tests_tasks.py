@@ -2,10 +2,12 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.db.models import F
 from django.test import TestCase, override_settings
 
 from base.factories import BrandFactory, CategoryFactory, ProductFactory
-from base.models import Order, OrderItem, ShippingAddress
+from base.models import Order, OrderItem, Product, ShippingAddress
+from base.services.embeddings import refresh_dirty_embeddings
 from base.services.emails import send_order_confirmation_email
 from base.services.stock import decrement_stock, queue_order_confirmation
 
@@ -94,3 +96,67 @@ class StockAlertTests(TestCase):
         self.product.save()
         decrement_stock(self.product, 1)
         mock_enqueue.assert_not_called()
+
+
+def _fake_vectors(texts):
+    return [[0.1] * 384 for _ in texts]
+
+
+class EmbeddingRefreshTests(TestCase):
+    def setUp(self):
+        # Started here rather than as a class decorator so setUp's own
+        # refresh never loads the real model either.
+        patcher = patch("base.services.embeddings.embed_texts", side_effect=_fake_vectors)
+        self.mock_embed = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.brand = BrandFactory(name="Acme")
+        self.product = ProductFactory(brand=self.brand, countInStock=10)
+        refresh_dirty_embeddings()
+        self.product.refresh_from_db()
+
+    def test_refresh_stores_hash_and_clears_flag(self):
+        self.assertEqual(self.product.embeddingDirty, 0)
+        self.assertEqual(self.product.embeddingHash, self.product.embedding_hash())
+        self.mock_embed.reset_mock()
+        self.assertEqual(refresh_dirty_embeddings(), 0)
+        self.mock_embed.assert_not_called()
+
+    def test_stock_change_does_not_mark_dirty(self):
+        with patch("base.services.stock.enqueue_background"):
+            decrement_stock(self.product, 2)
+        self.product.save()  # full save, text unchanged
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.embeddingDirty, 0)
+
+    def test_text_change_is_reembedded_once(self):
+        self.product.name = "Renamed"
+        self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.embeddingDirty, 1)
+
+        self.mock_embed.reset_mock()
+        self.assertEqual(refresh_dirty_embeddings(), 1)
+        self.mock_embed.assert_called_once()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.embeddingHash, self.product.embedding_hash())
+
+    def test_brand_rename_marks_products(self):
+        self.brand.name = "Acme Pro"
+        self.brand.save()
+        self.assertEqual(refresh_dirty_embeddings(), 1)
+
+    def test_change_during_refresh_stays_dirty(self):
+        def edit_mid_batch(texts):
+            texts = list(texts)
+            Product.objects.filter(pk=self.product.pk).update(name="Edited again")
+            Product.objects.filter(pk=self.product.pk).update(embeddingDirty=F("embeddingDirty") + 1)
+            return _fake_vectors(texts)
+
+        self.product.name = "Renamed"
+        self.product.save()
+        self.mock_embed.side_effect = edit_mid_batch
+        refresh_dirty_embeddings()
+        self.product.refresh_from_db()
+        self.assertGreater(self.product.embeddingDirty, 0)
+        self.assertNotEqual(self.product.embeddingHash, self.product.embedding_hash())
+
@@ -6,10 +6,12 @@ urlpatterns = [
 
    path('categories/', product_views.getCategories, name="category"),
    path('brand/', product_views.getBrand, name="brand"),
+   path('facets/', product_views.getProductFacets, name="product-facets"),
    path('', product_views.getProducts,name="products"),
    path('create/', product_views.createProduct,name="product-create"),
    path('upload/', product_views.uploadImage,name="image-upload"),
    path('top/',product_views.getTopProducts, name='top-products'),
+   path('batch/', product_views.getProductsBatch, name='products-batch'),
    path('<str:pk>/reviews/', product_views.createProductReview, name="create-review"),
    path('<str:pk>/', product_views.getProduct,name="product"),
    path('delete/<str:pk>/', product_views.deleteProduct,name="product-delete"),
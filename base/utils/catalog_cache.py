@@ -1,73 +1,432 @@
+import gzip
 import hashlib
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 
 from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_vary_headers
 
 
 CATALOG_PREFIX = "catalog"
 PRODUCTS_TTL = 300
 META_TTL = 600
+# How long a previous-version / expired payload may still be served while
+# exactly one worker recomputes it.
+STALE_TTL = 120
+# Single-flight lock: auto-expires so a crashed worker cannot wedge a key.
+LOCK_TIMEOUT = 10
+# How long a request without a stale copy waits for the lock holder.
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+# Rendered mode: bodies at least this large are stored gzip-compressed.
+GZIP_MIN_BYTES = 1024
+# Response headers replayed on rendered-mode hits.
+REPLAYED_HEADERS = ("Cache-Control",)
+# Bumped by invalidate_catalog_cache(); every entry carries it.
+GLOBAL_TAG = "global"
+# In-process L1 in front of the shared cache: entries per worker process.
+L1_MAX_ENTRIES = 512
+# How long a process trusts its copy of a tag version before re-reading it.
+# Bumps from other processes become visible within this interval.
+TAG_CHECK_INTERVAL = 1.0
+# Hot-key registry: per-process hit counts are merged into the shared
+# registry at most every HIT_FLUSH_INTERVAL seconds; counts halve every
+# HOT_HALF_LIFE seconds and only the HOT_KEYS_MAX hottest entries are kept.
+HIT_FLUSH_INTERVAL = 30
+HOT_HALF_LIFE = 3600
+HOT_KEYS_MAX = 200
+HOT_KEYS_KEY = f"{CATALOG_PREFIX}:hot"
+# Set on requests replayed by the warmer so they do not count as hits.
+WARM_META_KEY = "catalog.warm"
 
+_accepts_gzip = re.compile(r"\bgzip\b")
 
-def _version_key():
-    return f"{CATALOG_PREFIX}:version"
 
+class _LocalTier:
+    """Per-process LRU of catalog entries plus recently read tag versions."""
 
-def catalog_version():
-    version = cache.get(_version_key())
-    if version is None:
-        version = 1
-        cache.set(_version_key(), version, None)
-    return version
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.tags = {}
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            entry, expires_at = item
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: dict, timeout: int):
+        with self.lock:
+            self.entries[key] = (entry, time.time() + timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def tag_versions(self, tags) -> dict:
+        """Locally known versions of `tags` read within TAG_CHECK_INTERVAL."""
+        horizon = time.monotonic() - TAG_CHECK_INTERVAL
+        found = {}
+        with self.lock:
+            for tag in tags:
+                known = self.tags.get(tag)
+                if known is not None and known[1] > horizon:
+                    found[tag] = known[0]
+        return found
+
+    def remember_tags(self, versions: dict):
+        now = time.monotonic()
+        with self.lock:
+            for tag, version in versions.items():
+                self.tags[tag] = (version, now)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.tags.clear()
+
+
+_local = _LocalTier(L1_MAX_ENTRIES)
+
+_hits = {}
+_hits_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def clear_local_cache():
+    """Drop this process's L1 entries, tag versions and buffered hits (tests, benchmarks)."""
+    _local.clear()
+    with _hits_lock:
+        _hits.clear()
+
+
+def _record_hit(request, namespace: str, key: str, accept):
+    """Count a request for `key`, keeping what the warmer needs to replay it."""
+    global _last_flush
+    if request.META.get(WARM_META_KEY):
+        return
+    with _hits_lock:
+        item = _hits.get(key)
+        if item is None:
+            item = _hits[key] = {
+                "namespace": namespace,
+                "path": request.path,
+                "query": request.META.get("QUERY_STRING", ""),
+                "accept": accept,
+                "host": request.get_host(),
+                "secure": request.is_secure(),
+                "hits": 0,
+            }
+        item["hits"] += 1
+        due = time.monotonic() - _last_flush >= HIT_FLUSH_INTERVAL
+        if due:
+            _last_flush = time.monotonic()
+    if due:
+        flush_hit_counts()
+
+
+def flush_hit_counts():
+    """Merge this process's buffered hit counts into the shared hot-key registry."""
+    with _hits_lock:
+        pending = dict(_hits)
+        _hits.clear()
+    if not pending:
+        return
+
+    now = time.time()
+    registry = cache.get(HOT_KEYS_KEY) or {"updated": now, "keys": {}}
+    decay = 0.5 ** ((now - registry["updated"]) / HOT_HALF_LIFE)
+    keys = {key: {**item, "hits": item["hits"] * decay} for key, item in registry["keys"].items()}
+    for key, item in pending.items():
+        if key in keys:
+            item = {**item, "hits": keys[key]["hits"] + item["hits"]}
+        keys[key] = item
+    hottest = sorted(keys.items(), key=lambda kv: kv[1]["hits"], reverse=True)[:HOT_KEYS_MAX]
+    cache.set(HOT_KEYS_KEY, {"updated": now, "keys": dict(hottest)}, None)
+
+
+def hot_entries(limit: int) -> list:
+    """The `limit` most requested cached_catalog entries, hottest first."""
+    registry = cache.get(HOT_KEYS_KEY) or {"keys": {}}
+    return sorted(registry["keys"].values(), key=lambda item: item["hits"], reverse=True)[:limit]
+
+
+def _tag_key(tag: str) -> str:
+    return f"{CATALOG_PREFIX}:tag:{tag}"
+
+
+def invalidate_catalog_tags(*tags):
+    """
+    Invalidate every cached entry carrying any of `tags`.
+
+    A tag's version is the wall-clock time of its last bump, so an entry
+    rendered while one of its tags changed can be detected (and not stored)
+    even though tags depend on the rendered rows.
+    """
+    from base.services.catalog_warm import schedule_catalog_warm
+
+    now = time.time_ns()
+    cache.set_many({_tag_key(tag): now for tag in set(tags)}, None)
+    _local.remember_tags({tag: now for tag in tags})
+    transaction.on_commit(schedule_catalog_warm)
 
 
 def invalidate_catalog_cache():
-    try:
-        cache.incr(_version_key())
-    except ValueError:
-        cache.set(_version_key(), 1, None)
+    """Invalidate the whole catalog (bulk jobs, rebuilds)."""
+    invalidate_catalog_tags(GLOBAL_TAG)
 
 
-def _make_key(namespace: str, payload: dict) -> str:
+def _read_tag_versions(tags) -> dict:
+    keys = {_tag_key(tag): tag for tag in tags}
+    versions = {keys[key]: version for key, version in cache.get_many(list(keys)).items()}
+    _local.remember_tags(versions)
+    return versions
+
+
+def current_tag_versions(tags) -> dict:
+    """Tag versions, from the local copy when it was read recently enough."""
+    versions = _local.tag_versions(tags)
+    missing = [tag for tag in tags if tag not in versions]
+    if missing:
+        versions.update(_read_tag_versions(missing))
+    return versions
+
+
+def snapshot_tag_versions(tags, floor: int) -> dict:
+    """
+    Current versions of `tags`, read from the shared cache. Missing tags
+    (never bumped, or evicted) start at `floor`, which is newer than any
+    version an older entry could hold.
+    """
+    versions = _read_tag_versions(tags)
+    for tag in set(tags) - set(versions):
+        cache.add(_tag_key(tag), floor, None)
+        versions[tag] = cache.get(_tag_key(tag), floor)
+    _local.remember_tags(versions)
+    return versions
+
+
+def _tags_current(entry: dict) -> bool:
+    tags = entry["tags"]
+    return current_tag_versions(tags) == tags
+
+
+def product_tags(products) -> set:
+    """Tags for entries that render `products` (ids, plus nested category/brand)."""
+    tags = set()
+    for product in products:
+        tags.add(f"product:{product.pk}")
+        if product.category_id:
+            tags.add(f"category:{product.category_id}")
+        if product.brand_id:
+            tags.add(f"brand:{product.brand_id}")
+    return tags
+
+
+def listing_scope_tags(product) -> set:
+    """Tags for listings `product` may enter or move within."""
+    tags = {"products:all"}
+    if product.category_id:
+        tags.add(f"products:category:{product.category.slug}")
+    if product.brand_id:
+        tags.add(f"products:brand:{product.brand.slug}")
+    return tags
+
+
+def tag_response(response, *tags):
+    """Attach invalidation tags to a response cached by @cached_catalog."""
+    response.catalog_tags = set(getattr(response, "catalog_tags", ())) | set(tags)
+    return response
+
+
+def _digest(payload: dict) -> str:
     raw = json.dumps(payload, sort_keys=True, default=str)
-    digest = hashlib.md5(raw.encode()).hexdigest()
-    return f"{CATALOG_PREFIX}:v{catalog_version()}:{namespace}:{digest}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _make_key(namespace: str, payload: dict) -> str:
+    return f"{CATALOG_PREFIX}:{namespace}:{_digest(payload)}"
+
+
+def _envelope(data, ttl: int, tags: dict) -> dict:
+    return {"data": data, "tags": tags, "fresh_until": time.time() + ttl}
+
+
+def _rendered_envelope(request, response, ttl: int, tags: dict) -> dict:
+    """Render once and keep the bytes (gzip-compressed when large)."""
+    renderer = request.accepted_renderer
+    body = renderer.render(
+        response.data,
+        request.accepted_media_type,
+        {"request": request, "response": response},
+    )
+    encoding = None
+    if len(body) >= GZIP_MIN_BYTES:
+        body, encoding = gzip.compress(body, compresslevel=6), "gzip"
+    return {
+        "body": body,
+        "encoding": encoding,
+        "content_type": renderer.media_type,
+        "headers": {h: response[h] for h in REPLAYED_HEADERS if response.has_header(h)},
+        "tags": tags,
+        "fresh_until": time.time() + ttl,
+    }
+
+
+def _is_fresh(entry) -> bool:
+    return entry is not None and entry["fresh_until"] > time.time() and _tags_current(entry)
+
+
+def _get_entry(key: str):
+    """L1 first; fall back to the shared cache for missing or outdated entries."""
+    entry = _local.get(key)
+    if _is_fresh(entry):
+        return entry
+    shared = cache.get(key)
+    if shared is None:
+        return entry
+    _local.set(key, shared, STALE_TTL + max(shared["fresh_until"] - time.time(), 0))
+    return shared
+
+
+def _set_entry(key: str, entry: dict, timeout: int):
+    cache.set(key, entry, timeout + STALE_TTL)
+    _local.set(key, entry, timeout + STALE_TTL)
 
 
 def get_cached(namespace: str, payload: dict):
-    return cache.get(_make_key(namespace, payload))
+    entry = _get_entry(_make_key(namespace, payload))
+    return entry["data"] if _is_fresh(entry) else None
+
+
+def set_cached(namespace: str, payload: dict, data, timeout: int, tags=()):
+    versions = snapshot_tag_versions({GLOBAL_TAG, f"ns:{namespace}", *tags}, time.time_ns())
+    _set_entry(_make_key(namespace, payload), _envelope(data, timeout, versions), timeout)
+
+
+def _cached_response(request, entry: dict, state: str):
+    if "body" not in entry:
+        from rest_framework.response import Response
+
+        response = Response(entry["data"])
+        response["X-Cache"] = state
+        return response
+
+    from django.http import HttpResponse
+
+    body = entry["body"]
+    gzipped = entry["encoding"] == "gzip"
+    if gzipped and not _accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        body, gzipped = gzip.decompress(body), False
 
+    response = HttpResponse(body, content_type=entry["content_type"])
+    for header, value in entry["headers"].items():
+        response[header] = value
+    if gzipped:
+        response["Content-Encoding"] = "gzip"
+    if entry["encoding"]:
+        patch_vary_headers(response, ("Accept-Encoding",))
+    response["X-Cache"] = state
+    return response
 
-def set_cached(namespace: str, payload: dict, data, timeout: int):
-    cache.set(_make_key(namespace, payload), data, timeout)
 
+def cached_catalog(namespace: str, ttl: int, rendered: bool = False):
+    """
+    Cache DRF Response .data dict built by the wrapped view.
 
-def cached_catalog(namespace: str, ttl: int):
-    """Cache DRF Response .data dict built by the wrapped view."""
+    Entries are invalidated by tag rather than by a global version: every
+    entry carries the global and `ns:<namespace>` tags plus whatever the view
+    attached with tag_response() (listing scope, rendered product/category/
+    brand ids), and a hit checks those tag versions in one get_many. A
+    stock change therefore only drops the pages showing that product.
+
+    Each process keeps the hottest entries in a bounded L1 (L1_MAX_ENTRIES)
+    and trusts tag versions it read within TAG_CHECK_INTERVAL, so repeated
+    hits are served without touching Redis; bumps made in the same process
+    apply at once, others within the interval.
+
+    Misses are single-flight: one request takes a short lock per cache key
+    and recomputes, while concurrent requests get the stale copy (tags
+    bumped or just past its TTL, within STALE_TTL) or briefly wait for the
+    fresh one. This keeps an admin edit from turning every hot
+    listing request into the same query at once.
+
+    With rendered=True, JSON responses are cached as the final rendered
+    bytes (gzip-compressed above GZIP_MIN_BYTES) plus content type, so hits
+    skip unpickling nested dicts and re-running the renderer, and
+    gzip-capable clients get the stored bytes as-is.
+    """
 
     def decorator(view_fn):
         @wraps(view_fn)
         def wrapper(request, *args, **kwargs):
+            as_bytes = rendered and getattr(request.accepted_renderer, "format", None) == "json"
             cache_payload = {
                 "path": request.path,
                 "query": dict(request.query_params),
                 "args": args,
                 "kwargs": kwargs,
             }
-            hit = get_cached(namespace, cache_payload)
-            if hit is not None:
-                from rest_framework.response import Response
+            if as_bytes:
+                cache_payload["format"] = request.accepted_media_type
+            key = _make_key(namespace, cache_payload)
+            _record_hit(request, namespace, key, cache_payload.get("format"))
+            entry = _get_entry(key)
+            if _is_fresh(entry):
+                return _cached_response(request, entry, "HIT")
+
+            def refresh():
+                started = time.time_ns()
+                response = view_fn(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response["X-Cache"] = "MISS"
 
-                response = Response(hit)
-                response["X-Cache"] = "HIT"
+                tags = {GLOBAL_TAG, f"ns:{namespace}", *getattr(response, "catalog_tags", ())}
+                versions = snapshot_tag_versions(tags, floor=started - 1)
+                if max(versions.values()) >= started:
+                    # A tag was bumped while rendering; the rows may predate it.
+                    return response
+                if as_bytes:
+                    new_entry = _rendered_envelope(request, response, ttl, versions)
+                else:
+                    new_entry = _envelope(response.data, ttl, versions)
+                _set_entry(key, new_entry, ttl)
                 return response
 
-            response = view_fn(request, *args, **kwargs)
-            if response.status_code == 200:
-                set_cached(namespace, cache_payload, response.data, ttl)
-                response["X-Cache"] = "MISS"
-            return response
+            lock_key = f"{key}:lock"
+            if cache.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    return refresh()
+                finally:
+                    cache.delete(lock_key)
+
+            # Someone else is recomputing this key.
+            if entry is not None:
+                return _cached_response(request, entry, "STALE")
+
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL)
+                entry = _get_entry(key)
+                if _is_fresh(entry):
+                    return _cached_response(request, entry, "HIT")
+                if cache.get(lock_key) is None:
+                    # Lock released without a result (error, or cache down).
+                    break
+            return refresh()
 
         return wrapper
 
@@ -1,32 +1,68 @@
+from functools import lru_cache
+
 from django.conf import settings
+from django.utils.encoding import iri_to_uri
+
+FALLBACK_PATH = "/images/placeholder.png"
+# Distinct (storage, name) and (host, path) pairs remembered per process;
+# storage URLs are a pure function of the name, so entries never go stale.
+MEDIA_URL_CACHE_SIZE = 4096
+
+
+def absolute_media_url(image_field, request=None, origin=None):
+    """
+    Return a browser-ready image URL (Cloudinary HTTPS or backend absolute path).
 
+    `origin` is media_origin(request), for callers resolving many images
+    for the same request (see absolute_media_urls).
+    """
+    if origin is None:
+        origin = media_origin(request)
+    path = _storage_path(image_field.storage, image_field.name) if image_field else None
+    return _absolute(path or FALLBACK_PATH, request, origin)
 
-def absolute_media_url(image_field, request=None):
-    """Return a browser-ready image URL (Cloudinary HTTPS or backend absolute path)."""
-    if not image_field:
-        return _fallback_url(request)
 
+def absolute_media_urls(image_fields, request=None) -> list:
+    """absolute_media_url() for a whole page of images, resolving the host once."""
+    origin = media_origin(request)
+    return [absolute_media_url(image_field, request, origin) for image_field in image_fields]
+
+
+def media_origin(request=None) -> str:
+    """`scheme://host` of the request, else BACKEND_BASE_URL ("" when unset)."""
+    if request is not None:
+        # Host validation is not free; do it once per request.
+        origin = getattr(request, "_media_origin", None)
+        if origin is None:
+            origin = request._media_origin = request.build_absolute_uri("/")[:-1]
+        return origin
+    return getattr(settings, "BACKEND_BASE_URL", "").rstrip("/")
+
+
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def _storage_path(storage, name):
+    """storage.url(name) as an http(s) URL or a "/"-rooted path; None if unresolvable."""
     try:
-        url = image_field.url
+        url = storage.url(name)
     except (ValueError, AttributeError):
-        return _fallback_url(request)
-
+        return None
     if url.startswith("http://") or url.startswith("https://"):
         return url
+    return url if url.startswith("/") else f"/{url}"
 
-    path = url if url.startswith("/") else f"/{url}"
-    if request is not None:
-        return request.build_absolute_uri(path)
 
-    base = getattr(settings, "BACKEND_BASE_URL", "").rstrip("/")
-    if base:
-        return f"{base}{path}"
-    return path
+def _absolute(path, request, origin):
+    if path.startswith("http://") or path.startswith("https://"):
+        return path
+    if request is None:
+        return f"{origin}{path}"
+    if path.startswith("//") or "/./" in path or "/../" in path:
+        # Paths build_absolute_uri would urljoin rather than prefix.
+        return request.build_absolute_uri(path)
+    return _join(origin, path)
 
 
-def _fallback_url(request=None):
-    path = "/images/placeholder.png"
-    if request is not None:
-        return request.build_absolute_uri(path)
-    base = getattr(settings, "BACKEND_BASE_URL", "").rstrip("/")
-    return f"{base}{path}" if base else path
+@lru_cache(maxsize=MEDIA_URL_CACHE_SIZE)
+def _join(origin, path):
+    # What request.build_absolute_uri(path) returns for a plain "/" path.
+    return iri_to_uri(f"{origin}{path}")
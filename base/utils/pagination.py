@@ -0,0 +1,139 @@
+import base64
+import binascii
+import json
+from operator import attrgetter
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist, ValidationError
+from django.db.models import F, Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor("Cursor does not match the requested ordering")
+    return values
+
+
+def order_by_keys(queryset, keys):
+    """
+    Order by `-field` / `field` keys with NULLs always last.
+
+    NULLS LAST is only spelled out for nullable columns so that plain
+    B-tree indexes on NOT NULL columns still match the ORDER BY.
+    """
+    expressions = []
+    for key in keys:
+        name = key.lstrip("-")
+        nulls_last = True if _nullable(queryset.model, name) else None
+        if key.startswith("-"):
+            expressions.append(F(name).desc(nulls_last=nulls_last))
+        else:
+            expressions.append(F(name).asc(nulls_last=nulls_last))
+    return queryset.order_by(*expressions)
+
+
+def _resolve(model, path: str):
+    """(last concrete field or None for an annotation, whether the path can be NULL)."""
+    opts = model._meta
+    nullable = False
+    field = None
+    for part in path.split("__"):
+        try:
+            field = opts.get_field(part)
+        except FieldDoesNotExist:
+            # Annotations (e.g. a computed rank) are never NULL here.
+            return None, nullable
+        if field.is_relation:
+            # Reverse relations and nullable FKs become LEFT JOINs.
+            nullable = nullable or field.auto_created or field.null
+            opts = field.related_model._meta
+        else:
+            nullable = nullable or field.null
+    if field is not None and field.is_relation:
+        field = field.target_field
+    return field, nullable
+
+
+def _nullable(model, path: str) -> bool:
+    return _resolve(model, path)[1]
+
+
+def _coerce(model, keys, values) -> list:
+    """Cursor values as their ordering fields' Python types (annotations as float)."""
+    coerced = []
+    for key, value in zip(keys, values):
+        if value is None:
+            coerced.append(None)
+            continue
+        field = _resolve(model, key.lstrip("-"))[0]
+        try:
+            coerced.append(float(value) if field is None else field.to_python(value))
+        except (ValidationError, ValueError, TypeError, OverflowError):
+            raise InvalidCursor("Cursor does not match the requested ordering") from None
+    return coerced
+
+
+def _after(model, keys, values) -> Q:
+    """Rows strictly after `values` in the (NULLS LAST) ordering given by `keys`."""
+    condition = Q()
+    equal = Q()
+    for key, value in zip(keys, values):
+        name = key.lstrip("-")
+        nullable = _nullable(model, name)
+        if value is None:
+            # NULLs sort last, so only other NULLs can follow a NULL key.
+            equal &= Q(**{f"{name}__isnull": True})
+            continue
+
+        lookup = "lt" if key.startswith("-") else "gt"
+        step = Q(**{f"{name}__{lookup}": value})
+        if nullable:
+            step |= Q(**{f"{name}__isnull": True})
+        condition |= equal & step
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _key_values(obj, keys):
+    values = []
+    for key in keys:
+        try:
+            values.append(attrgetter(key.lstrip("-").replace("__", "."))(obj))
+        except (AttributeError, ObjectDoesNotExist):
+            values.append(None)
+    return values
+
+
+def keyset_page(queryset, keys, cursor=None, page_size=8):
+    """
+    Return (items, next_cursor) for one page of `queryset` ordered by `keys`.
+
+    The last key must be unique (the primary key) so the ordering is total.
+    Instead of OFFSET, the cursor carries the last row's key values and the
+    next page starts with a range predicate, so every page costs the same
+    index scan no matter how deep the shopper has paged.
+    """
+    queryset = order_by_keys(queryset, keys)
+    if cursor:
+        values = _coerce(queryset.model, keys, decode_cursor(cursor, len(keys)))
+        queryset = queryset.filter(_after(queryset.model, keys, values))
+
+    rows = list(queryset[: page_size + 1])
+
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(_key_values(rows[-1], keys))
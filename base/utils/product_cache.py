@@ -0,0 +1,113 @@
+import time
+
+from django.core.cache import cache
+
+from base.utils.catalog_cache import (
+    CATALOG_PREFIX,
+    GLOBAL_TAG,
+    current_tag_versions,
+    product_tags,
+    snapshot_tag_versions,
+)
+
+# Per-product list cards (cart / wishlist hydration).
+CARD_TTL = 600
+# Per-product detail representation (getProduct).
+DETAIL_TTL = 600
+
+
+def _card_key(pk) -> str:
+    return f"{CATALOG_PREFIX}:card:{pk}"
+
+
+def _detail_key(pk) -> str:
+    return f"{CATALOG_PREFIX}:detail:{pk}"
+
+
+def _is_current(entry) -> bool:
+    return entry is not None and current_tag_versions(entry["tags"]) == entry["tags"]
+
+
+def get_product_cards(ids, load) -> dict:
+    """
+    Return {id: card} for the `ids` that exist, from per-product cache entries.
+
+    Cached cards come back in one get_many and are validated against the
+    catalog tag versions (product:<id>, its category and brand), so they
+    are invalidated by the same signals as listings. `load(missing_ids)`
+    must return (product, card) pairs for the rest in a single query.
+    """
+    keys = {_card_key(pk): pk for pk in ids}
+    entries = cache.get_many(list(keys))
+
+    tags = set().union(*(entry["tags"] for entry in entries.values()))
+    current = current_tag_versions(tags)
+    cards = {
+        keys[key]: entry["card"]
+        for key, entry in entries.items()
+        if all(current.get(tag) == version for tag, version in entry["tags"].items())
+    }
+
+    missing = [pk for pk in ids if pk not in cards]
+    if not missing:
+        return cards
+
+    started = time.time_ns()
+    loaded = list(load(missing))
+    product_tag_sets = {product.pk: {GLOBAL_TAG, *product_tags([product])} for product, _ in loaded}
+    versions = snapshot_tag_versions(set().union(*product_tag_sets.values()), floor=started - 1)
+
+    fresh = {}
+    for product, card in loaded:
+        cards[product.pk] = card
+        snapshot = {tag: versions[tag] for tag in product_tag_sets[product.pk]}
+        # Skip cards whose tags were bumped while they were being rendered.
+        if max(snapshot.values()) < started:
+            fresh[_card_key(product.pk)] = {"card": card, "tags": snapshot}
+    if fresh:
+        cache.set_many(fresh, CARD_TTL)
+    return cards
+
+
+def get_product_detail(pk: int, render):
+    """
+    Detail representation of product `pk`, or None if it does not exist.
+
+    The entry is keyed by the product's tag versions, which are bumped only
+    when that product, its reviews, or its category/brand change.
+    `render(pk)` returns (product, data), or None for a missing product.
+    """
+    key = _detail_key(pk)
+    entry = cache.get(key)
+    if _is_current(entry):
+        return entry["data"]
+
+    started = time.time_ns()
+    rendered = render(pk)
+    if rendered is None:
+        return None
+    product, data = rendered
+    versions = snapshot_tag_versions({GLOBAL_TAG, *product_tags([product])}, floor=started - 1)
+    if max(versions.values()) < started:
+        cache.set(key, {"data": data, "tags": versions}, DETAIL_TTL)
+    return data
+
+
+def product_detail(pk: int, request=None):
+    """Cached ProductSerializer data (with reviews) for `pk`, or None."""
+    from base.models import Product
+    from base.serializers import ProductSerializer
+
+    def render(pk):
+        product = (
+            Product.objects.select_related("category", "brand")
+            .prefetch_related("review_set")
+            .filter(_id=pk)
+            .first()
+        )
+        if product is None:
+            return None
+        return product, ProductSerializer(product, context={"request": request}).data
+
+    return get_product_detail(pk, render)
+
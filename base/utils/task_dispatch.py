@@ -5,7 +5,7 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
-def enqueue_background(task, *args, **kwargs):
+def enqueue_background(task, *args, countdown=None, **kwargs):
     """
     Queue a Celery task without blocking the HTTP request.
 
@@ -17,7 +17,7 @@ def enqueue_background(task, *args, **kwargs):
         return None
 
     try:
-        return task.apply_async(args=args, kwargs=kwargs)
+        return task.apply_async(args=args, kwargs=kwargs, countdown=countdown)
     except Exception as exc:
         logger.warning("Failed to queue %s: %s", getattr(task, "name", task), exc)
         return None
@@ -1,19 +1,18 @@
 # base/views/ai_chat_views.py
 
 import re
-from functools import lru_cache
 
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
 
 from base.models import Product
-from base.serializers import ProductSerializer
+from base.services.search import SEARCH_CANDIDATES, search_products
+from base.services.semantic import semantic_matches
+from base.serializers import product_cards
 
-from pgvector.django import CosineDistance
-from base.ai.embedding import embed_text
+from base.ai.query_cache import embed_query
 
 
 # ----------------------------
@@ -85,15 +84,6 @@ def normalize_query(q: str) -> str:
     return " ".join(tokens).strip()
 
 
-# ----------------------------
-# Embedding cache (speed)
-# ----------------------------
-
-@lru_cache(maxsize=512)
-def embed_query_cached(text: str):
-    return embed_text(text)
-
-
 # ----------------------------
 # Retrieval (keyword + semantic)
 # ----------------------------
@@ -108,30 +98,27 @@ def retrieve_products(q: str, top_k: int = 8):
         q_clean = q_raw  # if user wrote only "best"
 
     keyword_qs = (
-        Product.objects.select_related("category", "brand")
-        .filter(
-            Q(name__icontains=q_clean) |
-            Q(brand__name__icontains=q_clean) |
-            Q(category__name__icontains=q_clean) |
-            Q(description__icontains=q_clean)
+        search_products(
+            Product.objects.select_related("category", "brand"),
+            q_clean,
+            candidates=SEARCH_CANDIDATES,
+            fallback_fields=("name", "brand__name", "category__name", "description"),
         )
-        # rank “best” style queries toward high rating / reviews
-        .order_by("-rating", "-numReviews", "-createdAt")[:top_k]
+        # best text match first, then “best” style ties toward high rating / reviews
+        .order_by("-rank", "-rating", "-numReviews", "-createdAt")[:top_k]
     )
 
-    query_vec = embed_query_cached(q_clean)
-    keyword_ids = keyword_qs.values_list("_id", flat=True)
+    query_vec = embed_query(q_clean)
 
-    semantic_qs = (
-        Product.objects.exclude(embedding__isnull=True)
-        .exclude(_id__in=keyword_ids)
-        .select_related("category", "brand")
-        .annotate(distance=CosineDistance("embedding", query_vec))
-        .filter(distance__lte=0.45)
-        .order_by("distance")[:top_k]
+    semantic = semantic_matches(
+        Product.objects.select_related("category", "brand"),
+        query_vec,
+        0.45,
+        top_k,
+        exclude_ids=[p._id for p in keyword_qs],
     )
 
-    final_list = list(keyword_qs) + list(semantic_qs)
+    final_list = list(keyword_qs) + semantic
     return final_list[:top_k]
 
 
@@ -201,7 +188,7 @@ def ai_chat(request):
             reverse=True,
         )
 
-    products_json = ProductSerializer(products, many=True, context={"request": request}).data
+    products_json = product_cards(products, request)
     answer = generate_answer(msg, products)
 
     return Response({
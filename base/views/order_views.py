@@ -6,7 +6,7 @@ from rest_framework.response import Response
 
 from base.models import Product, Order, OrderItem, ShippingAddress
 from base.serializers import ProductSerializer, OrderSerializer
-from base.utils.media import absolute_media_url
+from base.utils.media import absolute_media_url, media_origin
 from base.services.stock import decrement_stock, queue_order_confirmation
 
 from rest_framework import status
@@ -54,6 +54,7 @@ def addOrderItems(request):
     )
 
     # Create order items and set order relationship
+    origin = media_origin(request)
     for i in orderItems:
         try:
             product = Product.objects.get(_id=i['product'])
@@ -66,7 +67,7 @@ def addOrderItems(request):
             name=product.name,
             qty=i['qty'],
             price=i['price'],
-            image=absolute_media_url(product.image, request),
+            image=absolute_media_url(product.image, request, origin),
         )
 
         try:
@@ -5,8 +5,8 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
-from base.models import Product, Review
-from base.serializers import ProductSerializer
+from base.models import Product
+from base.serializers import ProductSerializer, product_cards
 
 from rest_framework import status
 from django.db.models import F,Q
@@ -14,11 +14,55 @@ from base.models import Category,Brand
 from base.serializers import CategorySerializer,BrandSerializer
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from pgvector.django import CosineDistance
 
-# LOAD MODEL ONCE (important)
-from base.ai.embedding import embed_text
-from base.utils.catalog_cache import cached_catalog, invalidate_catalog_cache, META_TTL, PRODUCTS_TTL
+from base.ai.query_cache import embed_query
+from base.utils.catalog_cache import (
+    cached_catalog,
+    invalidate_catalog_cache,
+    product_tags,
+    tag_response,
+    META_TTL,
+    PRODUCTS_TTL,
+)
+from base.utils.pagination import InvalidCursor, keyset_page, order_by_keys
+from base.utils.product_cache import get_product_cards, product_detail
+from base.services.facets import product_facets
+from base.services.rankings import RANKINGS_TAG
+from base.services.reviews import add_review
+from base.services.search import SEARCH_CANDIDATES, search_products
+from base.services.semantic import semantic_matches
+
+
+PAGE_SIZE = 8
+# Most ids one /products/batch/ call may hydrate (a large cart or wishlist).
+BATCH_MAX_IDS = 100
+
+# Every listing ordering ends with `_id` so pages are stable and cursorable.
+PRODUCT_ORDERINGS = {
+    'best_seller': ('-numReviews', '-_id'),
+    'featured': ('-rating', '-_id'),
+    'latest': ('-createdAt', '-_id'),
+    'most_reviewed': ('-numReviews', '-_id'),
+    'discount': ('-createdAt', '-_id'),
+}
+DEFAULT_ORDERING = ('-createdAt', '-_id')
+# best_seller/featured walk the precomputed ProductRanking index instead of
+# sorting live. Products not ranked yet (NULL, sorted last) follow in the
+# live order until the next refresh places them.
+RANKED_ORDERINGS = {
+    'best_seller': ('ranking__bestSellerRank', *PRODUCT_ORDERINGS['best_seller']),
+    'featured': ('ranking__featuredRank', *PRODUCT_ORDERINGS['featured']),
+}
+# Keyword listings without filter_by/sort: best full-text match first.
+RELEVANCE_ORDERING = ('-rank', '-_id')
+
+# Explicit `sort=` values; each one is served by a matching Product index.
+PRODUCT_SORTS = {
+    'price_asc': ('price', '_id'),
+    'price_desc': ('-price', '-_id'),
+    'rating': ('-rating', '-_id'),
+    'newest': ('-createdAt', '-_id'),
+}
 
 
 def _cache_public(response, max_age=300):
@@ -27,61 +71,120 @@ def _cache_public(response, max_age=300):
     return response
 
 
-@api_view(['GET'])
-@cached_catalog("products", PRODUCTS_TTL)
-def getProducts(request):
-    query = request.query_params.get('keyword', '')
-    category_slug = request.query_params.get('category_slug', '')
-    brand_slug = request.query_params.get('brand_slug', '')
-    filter_by = request.query_params.get('filter_by')
-    min_price = request.query_params.get('minPrice', '')
-    max_price = request.query_params.get('maxPrice', '')
+def _scope_tags(category_slug, brand_slug):
+    """Catalog cache tags for the set of products a listing draws from."""
+    tags = set()
+    if category_slug:
+        tags.add(f"products:category:{category_slug}")
+    if brand_slug:
+        tags.add(f"products:brand:{brand_slug}")
+    return tags or {"products:all"}
 
-    query_filter = Q(name__icontains=query)
+
+def _filtered_products(params):
+    """
+    Products matching the keyword/category/brand/price/filter_by params
+    shared by the listing and facets endpoints. Raises ValueError with the
+    client-facing message for malformed prices.
+    """
+    query_filter = Q()
 
     # Filter by category
-    if category_slug:
-        query_filter &= Q(category__slug=category_slug)
-    
+    if params.get('category_slug'):
+        query_filter &= Q(category__slug=params['category_slug'])
+
     # Filter by brand
-    if brand_slug:
-        query_filter &= Q(brand__slug=brand_slug)
-    
+    if params.get('brand_slug'):
+        query_filter &= Q(brand__slug=params['brand_slug'])
+
     # Filter by price range
-    if min_price:
-        try:
-            query_filter &= Q(price__gte=float(min_price))
-        except ValueError:
-            return Response({'detail': 'Invalid minPrice value'}, status=status.HTTP_400_BAD_REQUEST)
-    if max_price:
-        try:
-            query_filter &= Q(price__lte=float(max_price))
-        except ValueError:
-            return Response({'detail': 'Invalid maxPrice value'}, status=status.HTTP_400_BAD_REQUEST)
+    for param, lookup in (('minPrice', 'price__gte'), ('maxPrice', 'price__lte')):
+        if params.get(param):
+            try:
+                query_filter &= Q(**{lookup: float(params[param])})
+            except ValueError:
+                raise ValueError(f'Invalid {param} value') from None
+
+    products = Product.objects.filter(query_filter)
+    if params.get('keyword'):
+        # Full-text match, annotated with `rank` for relevance ordering.
+        products = search_products(products, params['keyword'])
 
     # Handle 'filter_by' conditions
-    if filter_by == 'best_seller':
-        products = Product.objects.filter(query_filter).select_related('category', 'brand').order_by('-numReviews')
-    elif filter_by == 'featured':
-        products = Product.objects.filter(query_filter, rating__gte=4.0).select_related('category', 'brand').order_by('-rating')
-    elif filter_by == 'latest':
-        products = Product.objects.filter(query_filter).select_related('category', 'brand').order_by('-createdAt')
-    elif filter_by == 'most_reviewed':
-        products = Product.objects.filter(query_filter).select_related('category', 'brand').order_by('-numReviews')
+    filter_by = params.get('filter_by')
+    if filter_by == 'featured':
+        products = products.filter(rating__gte=4.0)
     elif filter_by == 'discount':
-        # Fetch all products and filter them in Python
-        all_products = Product.objects.filter(query_filter).select_related('category', 'brand')
-        products = [
-            product for product in all_products
-            if product.discountPercentage and product.price and product.discount_price < product.price
-        ]
-    else:
-        products = Product.objects.filter(query_filter).select_related('category', 'brand').order_by('-createdAt')
+        # discountedPrice is the stored SQL twin of Product.discount_price.
+        products = products.filter(discountedPrice__lt=F('price'))
+    return products
+
+
+def _ranked(products, filter_by):
+    """(products, ordering) served from ProductRanking."""
+    # INNER JOIN (every product gets a row when it is created): the rank
+    # index then yields rows already in order, where a LEFT JOIN would sort
+    # the whole catalog.
+    return products.filter(ranking__isnull=False).select_related('ranking'), RANKED_ORDERINGS[filter_by]
+
+
+def _requested_fields(request):
+    """The `fields=name,price,...` list endpoints trim their cards to."""
+    return [f.strip() for f in request.query_params.get('fields', '').split(',') if f.strip()]
+
+
+def _cards(products, request):
+    """Listing cards (ProductListSerializer output via the fast path)."""
+    return product_cards(products, request, _requested_fields(request))
+
+
+@api_view(['GET'])
+@cached_catalog("products", PRODUCTS_TTL, rendered=True)
+def getProducts(request):
+    category_slug = request.query_params.get('category_slug', '')
+    brand_slug = request.query_params.get('brand_slug', '')
+    filter_by = request.query_params.get('filter_by')
+    sort = request.query_params.get('sort', '')
 
+    try:
+        products = _filtered_products(request.query_params).select_related('category', 'brand')
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    ordering = PRODUCT_ORDERINGS.get(filter_by, DEFAULT_ORDERING)
+    if request.query_params.get('keyword') and filter_by not in PRODUCT_ORDERINGS:
+        ordering = RELEVANCE_ORDERING
+    if sort:
+        if sort not in PRODUCT_SORTS:
+            return Response({'detail': 'Invalid sort value'}, status=status.HTTP_400_BAD_REQUEST)
+        ordering = PRODUCT_SORTS[sort]
+    tags = _scope_tags(category_slug, brand_slug)
+    if filter_by in RANKED_ORDERINGS and not sort:
+        tags.add(RANKINGS_TAG)
+        products, ordering = _ranked(products, filter_by)
+
+    # Cursor mode: keyset pagination, no COUNT(*) and no OFFSET scan.
+    if 'cursor' in request.query_params:
+        try:
+            page_items, next_cursor = keyset_page(
+                products,
+                ordering,
+                cursor=request.query_params.get('cursor'),
+                page_size=PAGE_SIZE,
+            )
+        except InvalidCursor:
+            return Response({'detail': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = _cache_public(Response({
+            'products': _cards(page_items, request),
+            'next_cursor': next_cursor,
+        }))
+        return tag_response(response, *tags, *product_tags(page_items))
+
+    products = order_by_keys(products, ordering)
 
     # Paginate the results
     page = request.query_params.get('page', 1)
-    paginator = Paginator(products, 8)
+    paginator = Paginator(products, PAGE_SIZE)
 
     try:
         products = paginator.page(page)
@@ -91,24 +194,41 @@ def getProducts(request):
         products = paginator.page(paginator.num_pages)
 
     # Serialize and return the data
-    serializer = ProductSerializer(products, many=True, context={"request": request})
-
-    return _cache_public(Response({
-        'products': serializer.data,
+    response = _cache_public(Response({
+        'products': _cards(products, request),
         'page': int(page),
         'pages': paginator.num_pages,
         'total': paginator.count,
     }))
+    return tag_response(response, *tags, *product_tags(products))
 
 @api_view(['GET'])
-@cached_catalog("categories", META_TTL)
+@cached_catalog("facets", PRODUCTS_TTL, rendered=True)
+def getProductFacets(request):
+    """Category/brand/price-bucket counts for the same filters getProducts takes."""
+    try:
+        products = _filtered_products(request.query_params)
+    except ValueError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    facets = product_facets(products)
+    response = _cache_public(Response(facets))
+    return tag_response(
+        response,
+        *_scope_tags(request.query_params.get('category_slug'), request.query_params.get('brand_slug')),
+        *(f"category:{c['id']}" for c in facets['categories']),
+        *(f"brand:{b['id']}" for b in facets['brands']),
+    )
+
+@api_view(['GET'])
+@cached_catalog("categories", META_TTL, rendered=True)
 def getCategories(request):
     categories = Category.objects.all()
     serializer = CategorySerializer(categories, many=True)
     return _cache_public(Response(serializer.data), max_age=600)
 
 @api_view(['GET'])
-@cached_catalog("brands", META_TTL)
+@cached_catalog("brands", META_TTL, rendered=True)
 def getBrand(request):
     brand = Brand.objects.all()
     serializer = BrandSerializer(brand, many=True)
@@ -116,19 +236,51 @@ def getBrand(request):
 
 
 @api_view(['GET'])
-@cached_catalog("top_products", META_TTL)
+@cached_catalog("top_products", META_TTL, rendered=True)
 def getTopProducts(request):
-    products = Product.objects.filter(rating__gte=4).order_by('-rating')[0:5]
-    serializer = ProductSerializer(products, many=True, context={"request": request})
-    return Response(serializer.data)
+    products = Product.objects.filter(rating__gte=4).select_related('category', 'brand')
+    products, ordering = _ranked(products, 'featured')
+    products = order_by_keys(products, ordering)[0:5]
+    return tag_response(Response(_cards(products, request)), "products:all", RANKINGS_TAG, *product_tags(products))
 
 @api_view(['GET'])
-def getProduct(request,pk):
+def getProductsBatch(request):
+    """Compact cards for `ids=1,2,3` (cart/wishlist hydration) in request order."""
+    try:
+        ids = [int(i) for i in request.query_params.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return Response({'detail': 'Invalid ids'}, status=status.HTTP_400_BAD_REQUEST)
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return Response({'detail': 'ids query param is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(ids) > BATCH_MAX_IDS:
+        return Response(
+            {'detail': f'At most {BATCH_MAX_IDS} ids per request'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    product= Product.objects.get(_id=pk)
-    serializer=ProductSerializer(product,many=False, context={"request": request})
+    def load(missing):
+        products = list(Product.objects.select_related('category', 'brand').filter(_id__in=missing))
+        return zip(products, product_cards(products, request))
 
-    return Response(serializer.data)
+    cards = get_product_cards(ids, load)
+    fields = _requested_fields(request)
+    if fields:
+        cards = {pk: {k: v for k, v in card.items() if k in fields} for pk, card in cards.items()}
+    return Response({
+        'products': [cards[pk] for pk in ids if pk in cards],
+        'missing': [pk for pk in ids if pk not in cards],
+    })
+
+@api_view(['GET'])
+def getProduct(request,pk):
+    try:
+        data = product_detail(int(pk), request)
+    except ValueError:
+        data = None
+    if data is None:
+        return Response({'detail': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(data)
 
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
@@ -273,23 +425,13 @@ def createProductReview(request, pk):
 
     # 3 - Create review
     else:
-        review = Review.objects.create(
-            user=user,
-            product=product,
-            name=user.first_name,
-            rating=data['rating'],
-            comment=data['comment'],
-        )
-
-        reviews = product.review_set.all()
-        product.numReviews = len(reviews)
+        try:
+            rating = int(data['rating'])
+        except (TypeError, ValueError):
+            content = {'detail': 'Invalid rating'}
+            return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-        total = 0
-        for i in reviews:
-            total += i.rating
-
-        product.rating = total / len(reviews)
-        product.save()
+        add_review(product, user, rating=rating, comment=data['comment'])
 
         return Response('Review Added')
 
@@ -305,43 +447,35 @@ def hybridSearch(request):
     MAX_DISTANCE = 0.35  # tune once, don't send from frontend
 
     # 1) Keyword search first (fast + exact)
-    keyword_qs = (
-        Product.objects
-        .select_related("category", "brand")
-        .filter(
-            Q(name__icontains=q) |
-            Q(brand__name__icontains=q) |
-            Q(category__name__icontains=q)
-        )
-        .order_by("-createdAt")[:TOP_K]
-    )
+    keyword_qs = search_products(
+        Product.objects.select_related("category", "brand"),
+        q,
+        candidates=SEARCH_CANDIDATES,
+        fallback_fields=("name", "brand__name", "category__name"),
+    ).order_by("-rank", "-createdAt")[:TOP_K]
 
     # IMPORTANT: keyword_qs is already sliced, so use len()
     if len(keyword_qs) >= 5:
         return Response({
             "mode": "keyword",
-            "products": ProductSerializer(keyword_qs, many=True, context={"request": request}).data
+            "products": _cards(keyword_qs, request)
         })
 
     # 2) Semantic fallback (only good similarity)
-    query_vec = embed_text(q)
-
-    keyword_ids = keyword_qs.values_list("_id", flat=True)
-
-    semantic_qs = (
-        Product.objects
-        .exclude(embedding__isnull=True)
-        .exclude(_id__in=keyword_ids)  # ✅ DB-level dedupe
-        .select_related("category", "brand")
-        .annotate(distance=CosineDistance("embedding", query_vec))
-        .filter(distance__lte=MAX_DISTANCE)
-        .order_by("distance")[:TOP_K]
+    query_vec = embed_query(q)
+
+    semantic = semantic_matches(
+        Product.objects.select_related("category", "brand"),
+        query_vec,
+        MAX_DISTANCE,
+        TOP_K,
+        exclude_ids=[p._id for p in keyword_qs],  # ✅ dedupe
     )
 
-    final_list = list(keyword_qs) + list(semantic_qs)
+    final_list = list(keyword_qs) + semantic
     final_list = final_list[:TOP_K]
 
     return Response({
         "mode": "hybrid",
-        "products": ProductSerializer(final_list, many=True, context={"request": request}).data
+        "products": _cards(final_list, request)
     })
\ No newline at end of file